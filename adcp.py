@@ -1,5 +1,8 @@
 import logging
 import string
+import datetime
+from dataclasses import dataclass
+from typing import Optional
 import pandas as pd
 import numpy as np
 from influxdb import DataFrameClient
@@ -10,6 +13,310 @@ import util_db
 
 logger = logging.getLogger('olmo.adcp')
 
+# Columns of the Nortek NMEA sentences in the adcp_*.dat files:
+PNORI_COLUMNS = [
+    'Identifier',
+    'Instrument type',
+    'Head ID',
+    'Number of beams',
+    'Number of cells',
+    'Blanking (m)',
+    'Cell size (m)',
+    'Coordinate system',
+    'Checksum']
+PNORS_COLUMNS = [
+    'Identifier',
+    'Date',
+    'Time',
+    'Error Code (hex)',
+    'Status Code (hex)',
+    'Battery Voltage',
+    'Sound Speed',
+    'Heading',
+    'Pitch (deg)',
+    'Roll (deg)',
+    'Presssure (dBar)',
+    'Temperature (dec C)',
+    'Analog input #1',
+    'Analog input #s',
+    'Checksum']
+PNORC_COLUMNS = [
+    'Identifier',
+    'Date',
+    'Time',
+    'Cell number',
+    'Velocity 1 (m/s) (Beam1/X/East)',
+    'Velocity 2 (m/s) (Beam1/X/North)',
+    'Velocity 3 (m/s) (Beam1/X/Up1)',
+    'Velocity 4 (m/s) (Beam1/X/Up2)',
+    'Speed (m/s)',
+    'Direction (deg)',
+    'Amplitude unit',
+    'Amplitude (Beam 1)',
+    'Amplitude (Beam 2)',
+    'Amplitude (Beam 3)',
+    'Amplitude (Beam 4)',
+    'Correlation (%) (Beam 1)',
+    'Correlation (%) (Beam 2)',
+    'Correlation (%) (Beam 3)',
+    'Correlation (%) (Beam 4)',
+    'Checksum']
+# The PNORS values that aren't numbers:
+PNORS_STR_COLUMNS = ['Error Code (hex)', 'Status Code (hex)']
+
+
+def nmea_checksum_ok(sentence):
+    '''True if the sentence ('$...*hh') has the right checksum: the xor of the chars between '$' and '*'.'''
+    body, sep, checksum = sentence.partition('*')
+    if not sep or body[:1] != '$':
+        return False
+    try:
+        expected = int(checksum[:2], 16)
+    except ValueError:
+        return False
+    value = 0
+    for b in body[1:].encode('ascii', errors='replace'):
+        value ^= b
+    return value == expected
+
+
+def field_name(column):
+    '''Influx field name of a column of the NMEA sentences, e.g. 'Blanking (m)' -> 'blanking_m'.'''
+    return column.translate(str.maketrans('', '', string.punctuation)).lower().replace(' ', '_')
+
+
+@dataclass
+class NortekRecords:
+    '''
+    The data of a file of Nortek NMEA sentences (see NortekNMEAParser), one
+    record (time) per PNORS sentence.
+
+    config : dict
+        PNORI column : value (str), of the first PNORI sentence.
+    time : np.ndarray
+        datetime64, (time,)
+    sensors : dict
+        PNORS column : np.ndarray (time,), float but for PNORS_STR_COLUMNS.
+    cell_number : np.ndarray
+        (time, cell), nan for the cells without a PNORC sentence.
+    velocity, amplitude, correlation : np.ndarray
+        (time, cell, beam)
+    speed, direction : np.ndarray
+        (time, cell)
+    amplitude_unit : str
+    n_rejected : int
+        Number of sentences dropped (bad checksum or values).
+    '''
+    config: dict
+    time: np.ndarray
+    sensors: dict
+    cell_number: np.ndarray
+    velocity: np.ndarray
+    amplitude: np.ndarray
+    correlation: np.ndarray
+    speed: np.ndarray
+    direction: np.ndarray
+    amplitude_unit: Optional[str]
+    n_rejected: int
+
+
+class NortekNMEAParser:
+    '''
+    Streaming parser of Nortek NMEA sentences (PNORI, PNORS and PNORC): the
+    lines are fed one at a time, and the values put straight into arrays.
+
+    The arrays are allocated for capacity records (times), and the number
+    of cells given by the PNORI sentence, and doubled when full. So parsing
+    is linear in the number of lines, and the memory used is that of the
+    arrays. Sentences with a bad checksum or values are dropped.
+
+    Each PNORS sentence starts a record, and the PNORC sentences with its
+    date and time fill its cells. A PNORC sentence with another date and
+    time starts a record (without PNORS values).
+
+    Parameters
+    ----------
+    n_beams : int
+    capacity : int
+        Initial number of records.
+    '''
+
+    def __init__(self, n_beams=4, capacity=64):
+        self.n_beams = n_beams
+        self.config = None
+        self.n_cells = 0
+        self.amplitude_unit = None
+        self.n_records = 0
+        self.n_rejected = 0
+        self._key = None
+        self._capacity = capacity
+        self._float_sensors = [c for c in PNORS_COLUMNS[3:-1] if c not in PNORS_STR_COLUMNS]
+        self._time = np.full(capacity, None, dtype=object)
+        self._sensors = {c: np.full(capacity, np.nan) for c in self._float_sensors}
+        self._sensors.update({c: np.full(capacity, None, dtype=object) for c in PNORS_STR_COLUMNS})
+        self._cells = self._allocate_cells(capacity)
+        self._sentences = {
+            '$PNORI': (self._pnori, len(PNORI_COLUMNS)),
+            '$PNORS': (self._pnors, len(PNORS_COLUMNS)),
+            '$PNORC': (self._pnorc, len(PNORC_COLUMNS))}
+
+    def _allocate_cells(self, capacity):
+        shape = (capacity, self.n_cells)
+        return {
+            'cell_number': np.full(shape, np.nan),
+            'velocity': np.full(shape + (self.n_beams,), np.nan),
+            'speed': np.full(shape, np.nan),
+            'direction': np.full(shape, np.nan),
+            'amplitude': np.full(shape + (self.n_beams,), np.nan),
+            'correlation': np.full(shape + (self.n_beams,), np.nan)}
+
+    def _grow(self):
+        capacity = 2 * self._capacity
+
+        def grown(a):
+            new = np.full((capacity,) + a.shape[1:], None if a.dtype == object else np.nan, dtype=a.dtype)
+            new[:self._capacity] = a
+            return new
+
+        self._time = grown(self._time)
+        self._sensors = {c: grown(a) for c, a in self._sensors.items()}
+        self._cells = {k: grown(a) for k, a in self._cells.items()}
+        self._capacity = capacity
+
+    def _new_record(self, key):
+        # A bad date or time would fail the parsing of all the times in result(), so the sentence is rejected here:
+        if len(key) != 12 or not key.isdigit():
+            raise ValueError(f"bad date and time {key}")
+        datetime.datetime.strptime(key, '%m%d%y%H%M%S')
+        if self.n_records == self._capacity:
+            self._grow()
+        self._time[self.n_records] = key
+        self._key = key
+        self.n_records += 1
+        return self.n_records - 1
+
+    def _pnori(self, values):
+        if self.config is not None:
+            if values[3] != self.config['Number of cells']:
+                raise ValueError(f"the number of cells changed from {self.config['Number of cells']}")
+            return
+        # No PNORC sentences can have been parsed yet, so the cells are (re)allocated empty:
+        self.n_cells = int(values[3])
+        self.config = dict(zip(PNORI_COLUMNS[1:-1], values))
+        self._cells = self._allocate_cells(self._capacity)
+
+    def _pnors(self, values):
+        floats = [float(v) for c, v in zip(PNORS_COLUMNS[3:-1], values[2:]) if c not in PNORS_STR_COLUMNS]
+        i = self._new_record(values[0] + values[1])
+        for c, v in zip(self._float_sensors, floats):
+            self._sensors[c][i] = v
+        for c in PNORS_STR_COLUMNS:
+            self._sensors[c][i] = values[PNORS_COLUMNS.index(c) - 1]
+
+    def _pnorc(self, values):
+        if self.config is None:
+            raise ValueError("PNORC before PNORI, the number of cells isn't known")
+        cell = int(values[2])
+        if not 1 <= cell <= self.n_cells:
+            raise ValueError(f"cell number {cell} out of range")
+        b = self.n_beams
+        velocity = [float(v) for v in values[3:3 + b]]
+        speed, direction = float(values[7]), float(values[8])
+        amplitude = [float(v) for v in values[10:10 + b]]
+        correlation = [float(v) for v in values[14:14 + b]]
+        key = values[0] + values[1]
+        i = self.n_records - 1 if key == self._key else self._new_record(key)
+        self._cells['cell_number'][i, cell - 1] = cell
+        self._cells['velocity'][i, cell - 1] = velocity
+        self._cells['speed'][i, cell - 1] = speed
+        self._cells['direction'][i, cell - 1] = direction
+        self._cells['amplitude'][i, cell - 1] = amplitude
+        self._cells['correlation'][i, cell - 1] = correlation
+        self.amplitude_unit = values[9]
+
+    def feed(self, line):
+        '''Parses one line, anything but a PNORI, PNORS or PNORC sentence is ignored.'''
+        line = line.strip()
+        parse, n_columns = self._sentences.get(line[:6], (None, None))
+        if parse is None:
+            return
+        values = line.partition('*')[0].split(',')[1:]
+        if not nmea_checksum_ok(line) or len(values) != n_columns - 2:
+            self.n_rejected += 1
+            return
+        try:
+            parse(values)
+        except ValueError as e:
+            logger.debug(f"Dropped sentence {line}: {e}")
+            self.n_rejected += 1
+
+    def result(self):
+        '''
+        Returns
+        -------
+        NortekRecords
+        '''
+        n = self.n_records
+        time = pd.to_datetime(self._time[:n].astype(str), format='%m%d%y%H%M%S').values
+        return NortekRecords(
+            config={} if self.config is None else self.config,
+            time=time,
+            sensors={c: a[:n] for c, a in self._sensors.items()},
+            amplitude_unit=self.amplitude_unit,
+            n_rejected=self.n_rejected,
+            **{k: a[:n] for k, a in self._cells.items()})
+
+
+def read_nortek_nmea(filename, n_beams=4):
+    '''
+    Reads an adcp_*.dat file of Nortek NMEA sentences, line by line (see
+    NortekNMEAParser).
+
+    Returns
+    -------
+    NortekRecords
+    '''
+    parser = NortekNMEAParser(n_beams=n_beams)
+    with open(filename, errors='replace') as file:
+        for line in file:
+            parser.feed(line)
+    if parser.n_rejected:
+        logger.warning(f"{parser.n_rejected} sentences of file {filename} dropped (bad checksum or values).")
+    return parser.result()
+
+
+def records_to_df(records):
+    '''
+    One row per record of a NortekRecords: the PNORI and PNORS values, and
+    the PNORC values of each cell with the suffix _i (i = cell number - 1),
+    with the same column names as the adcp_raw measurement. Indexed by time
+    (UTC). The cells without values in the file are left out.
+
+    Returns
+    -------
+    pd.DataFrame
+    '''
+    n = records.time.shape[0]
+    cols = {field_name(c): [v] * n for c, v in records.config.items()}
+    cols.update({field_name(c): a for c, a in records.sensors.items()})
+    velocity_cols = [field_name(c) for c in PNORC_COLUMNS[4:8]]
+    amplitude_cols = [field_name(c) for c in PNORC_COLUMNS[11:15]]
+    correlation_cols = [field_name(c) for c in PNORC_COLUMNS[15:19]]
+    for i in range(records.cell_number.shape[1]):
+        if np.isnan(records.cell_number[:, i]).all():
+            continue
+        cols[f'cell_number_{i}'] = records.cell_number[:, i]
+        for b, c in enumerate(velocity_cols):
+            cols[f'{c}_{i}'] = records.velocity[:, i, b]
+        cols[f'speed_ms_{i}'] = records.speed[:, i]
+        cols[f'direction_deg_{i}'] = records.direction[:, i]
+        cols[f'amplitude_unit_{i}'] = np.where(np.isnan(records.cell_number[:, i]), None, records.amplitude_unit)
+        for b, c in enumerate(amplitude_cols):
+            cols[f'{c}_{i}'] = records.amplitude[:, i, b]
+        for b, c in enumerate(correlation_cols):
+            cols[f'{c}_{i}'] = records.correlation[:, i, b]
+    return pd.DataFrame(cols, index=pd.DatetimeIndex(records.time, name='date').tz_localize('UTC'))
+
 
 class ADCP(sensor.Sensor):
     def __init__(self, influx_clients=None):
@@ -27,77 +334,16 @@ class ADCP(sensor.Sensor):
     def data_to_df(self, filename):
         '''Takes a adcp_*.dat fileaname and returns DataFrames for PNORI, PNORS, and PNORC'''
 
+        rows = {'$PNORI': [], '$PNORS': [], '$PNORC': []}
         with open(filename) as file:
-            lines = file.readlines()
-            lines = [line.rstrip() for line in lines]
-
-        PNORI = pd.DataFrame()
-        PNORS = pd.DataFrame()
-        PNORC = pd.DataFrame()
-
-        for l in lines:
-            data = l.replace('*', ',')
-            if (data[0:6].find('$PNORI')) == 0:
-                PNORI = PNORI.append(pd.DataFrame(
-                    [x.split(',') for x in data.split('\n')],
-                    index=None,
-                    columns=[
-                        'Identifier',
-                        'Instrument type',
-                        'Head ID',
-                        'Number of beams',
-                        'Number of cells',
-                        'Blanking (m)',
-                        'Cell size (m)',
-                        'Coordinate system',
-                        'Checksum']))
-
-            elif (data[0:6].find('$PNORS')) == 0:
-                PNORS = PNORS.append(pd.DataFrame(
-                    [x.split(',') for x in data.split('\n')],
-                    index=None,
-                    columns=[
-                        'Identifier',
-                        'Date',
-                        'Time',
-                        'Error Code (hex)',
-                        'Status Code (hex)',
-                        'Battery Voltage',
-                        'Sound Speed',
-                        'Heading',
-                        'Pitch (deg)',
-                        'Roll (deg)',
-                        'Presssure (dBar)',
-                        'Temperature (dec C)',
-                        'Analog input #1',
-                        'Analog input #s',
-                        'Checksum']))
-
-            elif (data[0:6].find('$PNORC')) == 0:
-                PNORC = PNORC.append(pd.DataFrame(
-                    [x.split(',') for x in data.split('\n')],
-                    index=None,
-                    columns=[
-                        'Identifier',
-                        'Date',
-                        'Time',
-                        'Cell number',
-                        'Velocity 1 (m/s) (Beam1/X/East)',
-                        'Velocity 2 (m/s) (Beam1/X/North)',
-                        'Velocity 3 (m/s) (Beam1/X/Up1)',
-                        'Velocity 4 (m/s) (Beam1/X/Up2)',
-                        'Speed (m/s)',
-                        'Direction (deg)',
-                        'Amplitude unit',
-                        'Amplitude (Beam 1)',
-                        'Amplitude (Beam 2)',
-                        'Amplitude (Beam 3)',
-                        'Amplitude (Beam 4)',
-                        'Correlation (%) (Beam 1)',
-                        'Correlation (%) (Beam 2)',
-                        'Correlation (%) (Beam 3)',
-                        'Correlation (%) (Beam 4)',
-                        'Checksum']))
+            for line in file:
+                data = line.rstrip().replace('*', ',')
+                if data[0:6] in rows:
+                    rows[data[0:6]].append(data.split(','))
+
+        PNORI = pd.DataFrame(rows['$PNORI'], columns=PNORI_COLUMNS)
+        PNORS = pd.DataFrame(rows['$PNORS'], columns=PNORS_COLUMNS)
+        PNORC = pd.DataFrame(rows['$PNORC'], columns=PNORC_COLUMNS)
 
         return PNORI, PNORS, PNORC
 
@@ -131,44 +377,22 @@ class ADCP(sensor.Sensor):
         influx_client = DataFrameClient(
             config.sintef_influx_pc, 8086, self.get_influx_user(), self.get_influx_pwd(), self.db_name)
 
-        def boring_font(df):
-            df.columns = df.columns.str.translate(str.maketrans('', '', string.punctuation)).str.lower().str.replace(' ', '_')
-            return df
-
         for f in files:
-            PNORI, PNORS, PNORC = self.data_to_df(f)
-
-            df_ingest = pd.DataFrame()
-            # First lets get the time info out:
-            date_and_time = PNORS.Date + PNORS.Time
-            df_ingest['date'] = pd.to_datetime(date_and_time, format='%m%d%y%H%M%S')
-            # Remove identifier and date/time cols:
-            # Standardise col names:
-            # Rename the checksum col (since name not unique):
-            PNORI = boring_font(PNORI.iloc[:, 1:]).rename(columns={'checksum': 'checksum_pnori'})
-            PNORS = boring_font(PNORS.iloc[:, 3:]).rename(columns={'checksum': 'checksum_pnors'})
-            PNORC = boring_font(PNORC.iloc[:, 3:]).rename(columns={'checksum': 'checksum_pnorc'})
-
-            # Join into once big wide DF
-            df_ingest = df_ingest.join(PNORI)
-            df_ingest = df_ingest.join(PNORS)
-            for i in range(PNORC.shape[0]):
-                df_ingest = df_ingest.join(PNORC.iloc[[i]].add_suffix(f'_{i}'))
+            records = read_nortek_nmea(f)
+            if records.time.shape[0] == 0:
+                logger.warning(f'No data in file {f}, skipping it.')
+                continue
+
+            # One wide row per time, the cells are suffixed _0, _1, ...
+            df_ingest = records_to_df(records)
 
             # Force all numeric cols to be floats:
-            not_float_cols = [
-                'date', 'head_id', 'checksum_pnori',
-                'error_code_hex', 'status_code_hex', 'checksum_pnors',
-            ]
-            for i in range(PNORC.shape[0]):
-                not_float_cols.append(f"amplitude_unit_{i}")
-                not_float_cols.append(f"checksum_pnorc_{i}")
+            not_float_cols = ['head_id', 'error_code_hex', 'status_code_hex']
+            not_float_cols += [c for c in df_ingest.columns if c.startswith('amplitude_unit_')]
             df_ingest = util_db.force_float_cols(df_ingest, not_float_cols=not_float_cols)
 
-            # TODO: Check that this time is correctly input now:
-            df_ingest = df_ingest.set_index('date').tz_localize('UTC', ambiguous='infer')
-            logger.info(f'Ingesting file {f} to {self.measurement_name}.')
-            influx_client.write_points(df_ingest, self.measurement_name)
+            logger.info(f'Ingesting file {f} to {self.measurement_name_l1}.')
+            influx_client.write_points(df_ingest, self.measurement_name_l1)
 
     def rsync_and_ingest(self):
 
@@ -1,5 +1,6 @@
 import os
 import json
+import datetime
 
 # General:
 if (base_dir := os.getenv("OLMO_BASE_DIRECTORY")) is None:
@@ -24,11 +25,14 @@ rsync_inbox = os.path.join(base_dir, 'Rsync_inbox')
 rsync_inbox_adcp = os.path.join(base_dir, 'Rsync_inbox_adcp')
 main_logfile = "log_munkholmen_ingest_"
 gas_logfile = "log_gasanalyser_ingest_"
+file_ledger = os.path.join(base_dir, 'file_ledger.sqlite')  # Remote files already processed (see util_ledger.py)
+file_ledger_overlap = datetime.timedelta(days=1)  # Files up to this much older than the newest processed are still looked for
 
 
 # Sync loggernet:
 loggernet_outbox = f"c:\\Users\{loggernet_user}\LoggerNet_output"
 loggernet_inbox = os.path.join(base_dir, 'Loggernet_inbox')
+loggernet_failed = os.path.join(base_dir, 'Loggernet_failed')  # Local copies of the files that failed to ingest
 loggernet_files_basenames = [
     "CR6_EOL2p0_meteo_ais_",
     "CR6_EOL2p0_Power_",  # instr.: solar_regulator
@@ -53,6 +57,29 @@ loggernet_files_basenames = [
 ]
 loggernet_logfile = "log_loggernet_ingest_"
 logpc_ssh_max_attempts = 3
+loggernet_settle = datetime.timedelta(minutes=5)  # Files modified more recently than this are left to the next run
+logpc_ssh_timeout = 240  # seconds, for connecting and for each command/copy to make progress
+loggernet_parse_workers = 4  # Processes parsing files while the next are copied, 1 to do one file at a time
+
+
+# Influx clients (see util_db.get_influx_client()):
+influx_port = 8086
+influx_timeout = 60  # seconds, per request
+influx_retries = 3
+influx_pool_size = 4
+
+
+# Influx write spool (batches that couldn't be written, replayed on the next run):
+influx_spool_dir = os.path.join(base_dir, 'Influx_spool')
+
+
+# Query cache (see util_cache.py):
+query_cache_dir = os.path.join(base_dir, 'Query_cache')
+query_cache_window = datetime.timedelta(hours=6)  # Length of each cached time window
+query_cache_settle = datetime.timedelta(hours=2)  # Windows ending earlier than this before now are cached
+query_cache_ttl = datetime.timedelta(days=1)  # Windows fetched longer ago than this are fetched again (late data)
+query_cache_max_age = datetime.timedelta(days=30)  # Fetched longer ago than this (i.e. unused) and the window is evicted
+query_cache_max_bytes = 2 * 1024**3
 
 
 # Backup files:
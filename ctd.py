@@ -1,4 +1,8 @@
 import os
+import hashlib
+from xml.parsers.expat import ExpatError
+from dataclasses import dataclass
+from typing import Callable
 import numpy as np
 import pandas as pd
 import seawater
@@ -12,6 +16,147 @@ import util_file
 logger = util_file.init_logger(config.main_logfile, name='olmo.ctd')
 
 
+@dataclass(frozen=True)
+class PHCoefficients:
+    slope: float
+    offset: float
+
+
+@dataclass(frozen=True)
+class FluorometerCoefficients:
+    '''Linear sensor: scale_factor * (vout - vblank)'''
+    scale_factor: float
+    vblank: float
+
+
+@dataclass(frozen=True)
+class PARCoefficients:
+    a0: float
+    a1: float
+    im: float
+
+
+@dataclass(frozen=True)
+class OxygenCoefficients:
+    a0: float
+    a1: float
+    a2: float
+    b0: float
+    b1: float
+    c0: float
+    c1: float
+    c2: float
+    ta0: float
+    ta1: float
+    ta2: float
+    ta3: float
+
+
+@dataclass(frozen=True)
+class CTDCalibration:
+    '''The calibration coefficients of the CTD's sensors, see parse_calibration().'''
+    ph: PHCoefficients
+    cdom: FluorometerCoefficients
+    par: PARCoefficients
+    chl: FluorometerCoefficients
+    ntu: FluorometerCoefficients
+    oxygen: OxygenCoefficients
+
+
+# Sensor type (element name in the .xmlcon file): (attribute of CTDCalibration, coefficients class,
+#                                                 {coefficient: element name})
+CALIBRATION_SENSORS = {
+    'pH_Sensor': ('ph', PHCoefficients, {'slope': 'Slope', 'offset': 'Offset'}),
+    'FluoroWetlabCDOM_Sensor': ('cdom', FluorometerCoefficients, {'scale_factor': 'ScaleFactor', 'vblank': 'Vblank'}),
+    'PARLog_SatlanticSensor': ('par', PARCoefficients, {'a0': 'a0', 'a1': 'a1', 'im': 'Im'}),
+    'FluoroWetlabECO_AFL_FL_Sensor': ('chl', FluorometerCoefficients, {'scale_factor': 'ScaleFactor', 'vblank': 'Vblank'}),
+    'TurbidityMeter': ('ntu', FluorometerCoefficients, {'scale_factor': 'ScaleFactor', 'vblank': 'DarkVoltage'}),
+    'OxygenSensor': ('oxygen', OxygenCoefficients, {c.lower(): c for c in [
+        'A0', 'A1', 'A2', 'B0', 'B1', 'C0', 'C1', 'C2', 'TA0', 'TA1', 'TA2', 'TA3']}),
+}
+
+_calibration_cache = {}
+
+
+def parse_calibration(xmlcon):
+    '''
+    Parses the coefficients of the CTD's sensors from a Seabird calibration
+    file. The sensors are found by their type, not their position in the
+    file. Results are cached by the hash of the file contents.
+
+    Parameters
+    ----------
+    xmlcon : bytes
+        Contents of the .xmlcon file.
+
+    Returns
+    -------
+    CTDCalibration
+    '''
+    file_hash = hashlib.sha256(xmlcon).hexdigest()
+    if file_hash in _calibration_cache:
+        return _calibration_cache[file_hash]
+
+    sensor_array = xmltodict.parse(xmlcon)['SBE_InstrumentConfiguration']['Instrument']['SensorArray']['Sensor']
+    sensors = {}
+    for sensor_element in sensor_array:
+        for sensor_type, values in sensor_element.items():
+            if not sensor_type.startswith('@'):
+                sensors[sensor_type] = values
+
+    coefficients = {}
+    for sensor_type, (name, coefficients_class, keys) in CALIBRATION_SENSORS.items():
+        if sensor_type not in sensors:
+            raise ValueError(f"Sensor {sensor_type} not found in the calibration file.")
+        coefficients[name] = coefficients_class(**{k: float(sensors[sensor_type][v]) for k, v in keys.items()})
+
+    calibration = CTDCalibration(**coefficients)
+    _calibration_cache[file_hash] = calibration
+    return calibration
+
+
+@dataclass(frozen=True)
+class DerivedVariable:
+    '''
+    A variable computed from the raw CTD data when it is ingested.
+
+    compute(ctd, df_all) returns the variable, from the columns of df_all
+    (raw columns, as in the ctd csv files, and the derived variables
+    before this one).
+    '''
+    measurement: str
+    column: str
+    unit: str
+    compute: Callable
+    needs_calibration: bool = True
+
+
+# Computed in this order, so a variable can use those before it:
+DERIVED_VARIABLES = [
+    DerivedVariable('ctd_depth_munkholmen', 'depth', 'metres',
+                    lambda ctd, df: seawater.eos80.dpth(df['Pressure'], ctd.MUNKHOLMEN_LATITUDE),
+                    needs_calibration=False),
+    DerivedVariable('ctd_density_munkholmen', 'density', 'kilograms_per_cubic_metre',
+                    lambda ctd, df: seawater.eos80.dens0(df['Salinity'], df['Temperature']),
+                    needs_calibration=False),
+    DerivedVariable('ctd_ph_munkholmen', 'ph', 'none',
+                    lambda ctd, df: ctd.calcpH(df['Temperature'], df['Volt0'])),
+    DerivedVariable('ctd_cdom_munkholmen', 'cdom', 'ppb',
+                    lambda ctd, df: ctd.calcCDOM(df['Volt1'])),
+    DerivedVariable('ctd_par_munkholmen', 'par', 'micro_mol_photons_per_metre_squared_per_second',
+                    lambda ctd, df: ctd.calcPAR(df['Volt2'])),
+    DerivedVariable('ctd_chl_munkholmen', 'chl', 'micro_grams_per_litre',
+                    lambda ctd, df: ctd.calcchl(df['Volt4'])),
+    DerivedVariable('ctd_ntu_munkholmen', 'ntu', 'ntu',
+                    lambda ctd, df: ctd.calcNTU(df['Volt5'])),
+    DerivedVariable('ctd_dissolved_oxygen_temperature_munkholmen', 'dissolved_oxygen_temperature', 'degrees_celcius',
+                    lambda ctd, df: ctd.calcDO_T(df['SBE63Temperature'])),
+    DerivedVariable('ctd_dissolved_oxygen_munkholmen', 'dissolved_oxygen', 'millilitres_per_litre',
+                    lambda ctd, df: ctd.calcDO(df['SBE63'], df['dissolved_oxygen_temperature'],
+                                               df['Salinity'], df['Pressure'])),
+]
+
+
 class CTD(sensor.Sensor):
     def __init__(self, influx_clients=None):
         # Init the Sensor() class: This sets some defaults.
@@ -23,72 +168,57 @@ class CTD(sensor.Sensor):
         self.remove_remote_files_l0 = True
         self.max_files_l0 = None
 
+        # Variables computed when ingesting (see derived_frames()), and the
+        # calibration they use (loaded when first needed, calibration_error
+        # is set if that failed, so it isn't tried again for every file):
+        self.derived_variables = list(DERIVED_VARIABLES)
+        self.calibration = None
+        self.calibration_error = None
+
         # Some constants needed for calculations:
         self.MUNKHOLMEN_LATITUDE = 63.456314
         self.ABSZERO = 273.15
         self.PH_CONSTANT = 1.98416e-4
 
     def load_calibration(self, path=os.path.join(config.base_dir, 'olmo', 'sensor_calibration', '19-8154.xmlcon')):
-        with open(path, 'r') as f:
-            calibfile = xmltodict.parse(f.read())
-        self.calibration = calibfile['SBE_InstrumentConfiguration']['Instrument']['SensorArray']['Sensor']
+        with open(path, 'rb') as f:
+            self.calibration = parse_calibration(f.read())
 
     def calcpH(self, temp, pHvout):
-        phslope = float(self.calibration[3]['pH_Sensor']['Slope'])
-        phoffset = float(self.calibration[3]['pH_Sensor']['Offset'])
+        c = self.calibration.ph
         ktemp = self.ABSZERO + temp
-        ph = 7 + (pHvout - phoffset) / (phslope * ktemp * self.PH_CONSTANT)
+        ph = 7 + (pHvout - c.offset) / (c.slope * ktemp * self.PH_CONSTANT)
         return ph
 
     def calcCDOM(self, CDOMvout):
-        scalefactor = float(self.calibration[4]['FluoroWetlabCDOM_Sensor']['ScaleFactor'])
-        vblank = float(self.calibration[4]['FluoroWetlabCDOM_Sensor']['Vblank'])
-        CDOM = scalefactor * (CDOMvout - vblank)
+        c = self.calibration.cdom
+        CDOM = c.scale_factor * (CDOMvout - c.vblank)
         return CDOM
 
     def calcPAR(self, PARvout):
-        PAR_a0 = float(self.calibration[5]['PARLog_SatlanticSensor']['a0'])
-        PAR_a1 = float(self.calibration[5]['PARLog_SatlanticSensor']['a1'])
-        Im = float(self.calibration[5]['PARLog_SatlanticSensor']['Im'])
-        PAR = Im * 10 ** ((PARvout - PAR_a0) / PAR_a1)
+        c = self.calibration.par
+        PAR = c.im * 10 ** ((PARvout - c.a0) / c.a1)
         return PAR
 
     def calcchl(self, chlvout):
-        scalefactor = float(self.calibration[6]['FluoroWetlabECO_AFL_FL_Sensor']['ScaleFactor'])
-        vblank = float(self.calibration[6]['FluoroWetlabECO_AFL_FL_Sensor']['Vblank'])
-        chl = scalefactor * (chlvout - vblank)
+        c = self.calibration.chl
+        chl = c.scale_factor * (chlvout - c.vblank)
         return chl
 
     def calcNTU(self, NTUvout):
-        scalefactor = float(self.calibration[7]['TurbidityMeter']['ScaleFactor'])
-        vblank = float((self.calibration[7]['TurbidityMeter']['DarkVoltage']))
-        NTU = scalefactor * (NTUvout - vblank)
+        c = self.calibration.ntu
+        NTU = c.scale_factor * (NTUvout - c.vblank)
         return NTU
 
     def calcDO_T(self, V):
-        TA0 = float(self.calibration[8]['OxygenSensor']['TA0'])
-        TA1 = float(self.calibration[8]['OxygenSensor']['TA1'])
-        TA2 = float(self.calibration[8]['OxygenSensor']['TA2'])
-        TA3 = float(self.calibration[8]['OxygenSensor']['TA3'])
-
-        def calcL(V):
-            L = np.log((100000 * V) / (3.3 - V))
-            return L
-
-        L = calcL(V)
-        T = 1 / (TA0 + (TA1 * L) + (TA2 * L**2) + (TA3 * L**3)) - self.ABSZERO
+        c = self.calibration.oxygen
+        L = np.log((100000 * V) / (3.3 - V))
+        T = 1 / (c.ta0 + (c.ta1 * L) + (c.ta2 * L**2) + (c.ta3 * L**3)) - self.ABSZERO
         return T
 
     def calcDO(self, DOphase, T, S, P):
         # manual-53_011 p47
-        A0 = float(self.calibration[8]['OxygenSensor']['A0'])
-        A1 = float(self.calibration[8]['OxygenSensor']['A1'])
-        A2 = float(self.calibration[8]['OxygenSensor']['A2'])
-        B0 = float(self.calibration[8]['OxygenSensor']['B0'])
-        B1 = float(self.calibration[8]['OxygenSensor']['B1'])
-        C0 = float(self.calibration[8]['OxygenSensor']['C0'])
-        C1 = float(self.calibration[8]['OxygenSensor']['C1'])
-        C2 = float(self.calibration[8]['OxygenSensor']['C2'])
+        c = self.calibration.oxygen
 
         def calcSalcorr(T, S):
             Ts = np.log((298.15 - T) / (self.ABSZERO + T))
@@ -112,11 +242,45 @@ class CTD(sensor.Sensor):
         Pcorr = calcPcorr(T, P)
         Scorr = calcSalcorr(T, S)
 
-        Ksv = (C0 + C1 * T + C2 * T**2)
+        Ksv = (c.c0 + c.c1 * T + c.c2 * T**2)
 
-        DO = (((A0 + A1 * T + A2 * V**2) / (B0 + B1 * V) - 1) / Ksv) * Scorr * Pcorr
+        DO = (((c.a0 + c.a1 * T + c.a2 * V**2) / (c.b0 + c.b1 * V) - 1) / Ksv) * Scorr * Pcorr
         return DO
 
+    def derived_frames(self, df_all, tag_values):
+        '''
+        Computes self.derived_variables, adding them as columns of df_all.
+
+        Parameters
+        ----------
+        df_all : pd.DataFrame
+            Raw CTD data, with the columns of the ctd csv files.
+        tag_values : dict
+            Tags of the raw data, the derived data are tagged with these,
+            but as 'processed' and with their own unit.
+
+        Returns
+        -------
+        list
+            Of (measurement, df), ready for util_db.ingest_dfs().
+        '''
+        if self.calibration is None and self.calibration_error is None \
+                and any(v.needs_calibration for v in self.derived_variables):
+            try:
+                self.load_calibration()
+            except (OSError, ValueError, KeyError, ExpatError) as error:
+                self.calibration_error = error
+                logger.warning(f"Could not load the CTD calibration, skipping the calibrated variables: {error!r}")
+
+        frames = []
+        for v in self.derived_variables:
+            if v.needs_calibration and self.calibration is None:
+                continue
+            df_all[v.column] = v.compute(self, df_all)
+            tags = dict(tag_values, tag_unit=v.unit, tag_data_level='processed')
+            frames.append((v.measurement, util_db.filter_and_tag_df(df_all, {v.column: v.column}, tags)))
+        return frames
+
     def ingest_l0(self, files):
 
         for f in files:
@@ -127,36 +291,34 @@ class CTD(sensor.Sensor):
             df_all[time_col] = pd.to_datetime(df_all[time_col], format='%Y-%m-%d %H:%M:%S')
             df_all = df_all.set_index(time_col).tz_localize('CET', ambiguous='infer').tz_convert('UTC')
 
-            df_all['density'] = seawater.eos80.dens0(df_all['Salinity'], df_all['Temperature'])
-            df_all['depth'] = seawater.eos80.dpth(df_all['Pressure'], self.MUNKHOLMEN_LATITUDE)
-
             tag_values = {'tag_sensor': 'ctd',
                           'tag_edge_device': 'munkholmen_topside_pi',
                           'tag_platform': 'munkholmen',
                           'tag_data_level': 'raw',
                           'tag_approved': 'no',
                           'tag_unit': 'none'}
+            frames = []
 
             # ------------------------------------------------------------ #
             measurement_name = 'ctd_temperature_munkholmen'
             field_keys = {"Temperature": 'temperature'}
             tag_values['tag_unit'] = 'degrees_celcius'
             df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            frames.append((measurement_name, df))
 
             # ------------------------------------------------------------ #
             measurement_name = 'ctd_conductivity_munkholmen'
             field_keys = {"Conductivity": 'conductivity'}
             tag_values['tag_unit'] = 'siemens_per_metre'
             df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            frames.append((measurement_name, df))
 
             # ------------------------------------------------------------ #
             measurement_name = 'ctd_pressure_munkholmen'
             field_keys = {"Pressure": 'pressure'}
             tag_values['tag_unit'] = 'none'
             df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            frames.append((measurement_name, df))
 
             # -------------drop----------------------------------------------- #
             measurement_name = 'ctd_sbe63_munkholmen'
@@ -164,14 +326,14 @@ class CTD(sensor.Sensor):
                           "SBE63Temperature": 'sbe63_temperature_voltage'}
             tag_values['tag_unit'] = 'none'
             df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            frames.append((measurement_name, df))
 
             # ------------------------------------------------------------ #
             measurement_name = 'ctd_salinity_munkholmen'
             field_keys = {"Salinity": 'salinity'}
             tag_values['tag_unit'] = 'none'
             df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            frames.append((measurement_name, df))
 
             # ------------------------------------------------------------ #
             measurement_name = 'ctd_voltages_munkholmen'
@@ -182,24 +344,14 @@ class CTD(sensor.Sensor):
                           "Volt5": 'volt5'}
             tag_values['tag_unit'] = 'none'
             df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            frames.append((measurement_name, df))
 
             # ------------------------------------------------------------ #
-            measurement_name = 'ctd_depth_munkholmen'
-            field_keys = {"depth": 'depth'}
-            tag_values['tag_unit'] = 'metres'
-            tag_values['tag_data_level'] = 'processed'
-            df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
-
-            # ------------------------------------------------------------ #
-            measurement_name = 'ctd_density_munkholmen'
-            field_keys = {"density": 'density'}
-            tag_values['tag_unit'] = 'kilograms_per_cubic_metre'
-            tag_values['tag_data_level'] = 'processed'
-            df = util_db.filter_and_tag_df(df_all, field_keys, tag_values)
-            util_db.ingest_df(measurement_name, df, self.influx_clients)
+            # Depth, density and the calibrated variables:
+            frames += self.derived_frames(df_all, tag_values)
 
+            # All the measurements are sent together:
+            util_db.ingest_dfs(frames, self.influx_clients)
             logger.info(f'File {f} ingested.')
 
     def rsync_and_ingest(self):
@@ -1,5 +1,7 @@
+import io
 import os
 import datetime
+import numpy as np
 import pandas as pd
 import zipfile
 
@@ -10,6 +12,96 @@ import util_file
 
 logger = util_file.init_logger(config.main_logfile, name='olmo.gasanalyser')
 
+# The zipped files have a "PGP message" at the end, the data ends before it.
+PGP_MARKER = b'-----BEGIN PGP MESSAGE-----'
+
+
+class _ZipMemberReader(io.RawIOBase):
+    '''Reads the member of a zip archive, up to the line with PGP_MARKER.'''
+
+    def __init__(self, zip_path):
+        self._zip = zipfile.ZipFile(zip_path, 'r')
+        names = self._zip.namelist()
+        name = os.path.basename(zip_path)[:-4]
+        self._member = self._zip.open(name if name in names else names[0])
+        self._line = b''
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = 0
+        while n < len(b):
+            if not self._line:
+                line = b'' if self._done else self._member.readline()
+                if not line or PGP_MARKER in line:
+                    self._done = True
+                    break
+                self._line = line
+            k = min(len(b) - n, len(self._line))
+            b[n:n + k] = self._line[:k]
+            self._line = self._line[k:]
+            n += k
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._member.close()
+            self._zip.close()
+        super().close()
+
+
+def open_data_file(path):
+    '''
+    Opens a gas analyser file for reading, a .zip is read directly from the
+    archive (without extracting it), and only up to the PGP message.
+
+    Returns
+    -------
+    binary file object
+    '''
+    if path[-4:] == '.zip':
+        return io.BufferedReader(_ZipMemberReader(path))
+    return open(path, 'rb')
+
+
+def read_gga(data, timezone='CET'):
+    '''
+    Reads a LGR-UGGA gas analyser data file (gga_*.txt).
+
+    The padding is removed from the column names (e.g. '      [CH4]_ppm'
+    becomes '[CH4]_ppm'). All columns but the time are made float, and
+    values that aren't numbers become -7999.0 (like
+    util_db.force_float_cols(error_to_nan=True)).
+
+    Parameters
+    ----------
+    data : str or file object
+    timezone : str
+        Of the times in the file.
+
+    Returns
+    -------
+    pd.DataFrame
+        Indexed by time (UTC).
+    '''
+    df = pd.read_csv(data, sep=',', skiprows=1, skipinitialspace=True)
+    df.columns = df.columns.str.strip()
+
+    # The columns the csv parser couldn't read as numbers:
+    for col in df.columns.drop('Time'):
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    value_cols = df.columns.drop('Time')
+    df[value_cols] = df[value_cols].astype(np.float64).fillna(-7999.0)
+
+    # Times are fixed width, 'dd/mm/YYYY HH:MM:SS.fff', rearranged to ISO 8601 which pandas parses fast:
+    t = df.pop('Time').str.strip()
+    t = t.str[6:10] + '-' + t.str[3:5] + '-' + t.str[0:2] + 'T' + t.str[11:]
+    df.index = pd.DatetimeIndex(pd.to_datetime(t, format='%Y-%m-%dT%H:%M:%S.%f'), name='Time')
+    return df.tz_localize(timezone, ambiguous='infer').tz_convert('UTC')
+
 
 class GasAnalyser(sensor.Sensor):
     def __init__(self, influx_clients=None):
@@ -27,33 +119,38 @@ class GasAnalyser(sensor.Sensor):
         self.drop_recent_files_l1 = 1
         self.remove_remote_files_l1 = False
         self.max_files_l1 = None
+        # The remote files aren't removed, so keep track of those already ingested:
+        self.use_file_ledger = True
 
     def ingest_l0(self, files):
+        '''
+        Ingests the gga_*.txt (or .txt.zip) files.
 
+        Returns
+        -------
+        list
+            The files done with: ingested, with no new data, or skipped on
+            purpose. Not those that failed, so they are tried again.
+        '''
+
+        done = []
         for f in files:
 
             # Special conditions:
-            # Note that the place we get the data from will continually refill with data. So we will
-            # continually reingest data. This is not optimal.
+            # Note that the place we get the data from will continually refill with data. The files
+            # already ingested are recorded in the file ledger, and not fetched again (see rsync()).
+            # The files that grow (and the .zip of a .txt already ingested) are fetched again, but only
+            # the data newer than that already ingested from them is ingested.
             #
             # If date is 2002-01-01: We should skip it.
             # If data is > 2022-09-01: We should label it as from the munkholmen buoy, otherwise its origin is unknown.
 
-            # Unzip any zip files:
+            # Zip files are read directly (see open_data_file()):
+            data_file = f
             file_type_tag = 'txt'
             if f[-4:] == '.zip':
                 file_type_tag = 'zip'
-                with zipfile.ZipFile(f, "r") as zip_ref:
-                    zip_ref.extractall(os.path.dirname(f))
                 f = f[:-4]
-                # These zip files have a "PGP message" at the end, which must be removed.
-                with open(f, "r+") as f_handle:
-                    for num, line in enumerate(f_handle):
-                        if '-----BEGIN PGP MESSAGE-----' in line:
-                            cut_line = num
-                            break
-                    f_handle.seek(cut_line)
-                    f_handle.truncate()
 
             # Will put this all into a try/except clause, since many files have odd formats I can't
             # be bothered dealing with (strange timestamps, not all cols)
@@ -61,17 +158,23 @@ class GasAnalyser(sensor.Sensor):
                 from_munkholmen = False
                 if f[-20:-10] in ['1800-01-01']:
                     # print(f"Skipping file: {f}")
+                    done.append(data_file)
                     continue
                 elif datetime.datetime.strptime(f[-20:-10], '%Y-%m-%d') > datetime.datetime(2022, 8, 31, 23, 59, 00):
                     from_munkholmen = True
                     # print(f"File {f} deemed from munkholmen.")
 
-                df_all = pd.read_csv(f, sep=',', skiprows=1)
+                with open_data_file(data_file) as data:
+                    df_all = read_gga(data)
 
-                time_col = '                     Time'
-                df_all = util_db.force_float_cols(df_all, not_float_cols=[time_col], error_to_nan=True)
-                df_all[time_col] = pd.to_datetime(df_all[time_col], format='  %d/%m/%Y %H:%M:%S.%f')
-                df_all = df_all.set_index(time_col).tz_localize('CET', ambiguous='infer').tz_convert('UTC')
+                # Only the data newer than that already ingested from the file:
+                last_time = self.last_ingested_time(os.path.basename(f))
+                if last_time is not None:
+                    df_all = df_all[df_all.index > pd.Timestamp(last_time, unit='s', tz='UTC')]
+                    if df_all.empty:
+                        logger.info(f'No new data in file {f}, skipping it.')
+                        done.append(data_file)
+                        continue
 
                 ted = 'munkholmen_topside_pi' if from_munkholmen else 'none'
                 tp = 'munkholmen' if from_munkholmen else 'none'
@@ -81,98 +184,105 @@ class GasAnalyser(sensor.Sensor):
                               'tag_data_level': 'raw',
                               'tag_approved': 'none',
                               'tag_file_type': file_type_tag}
+                frames = []
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_ch4'
-                field_keys = {"      [CH4]_ppm": util_db.format_str("      [CH4]_ppm"),
-                              "   [CH4]_ppm_sd": util_db.format_str("   [CH4]_ppm_sd")}
+                field_keys = {"[CH4]_ppm": util_db.format_str("[CH4]_ppm"),
+                              "[CH4]_ppm_sd": util_db.format_str("[CH4]_ppm_sd")}
                 tag_values['tag_unit'] = 'ppm'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_h2o'
-                field_keys = {"      [H2O]_ppm": util_db.format_str("      [H2O]_ppm"),
-                              "   [H2O]_ppm_sd": util_db.format_str("   [H2O]_ppm_sd")}
+                field_keys = {"[H2O]_ppm": util_db.format_str("[H2O]_ppm"),
+                              "[H2O]_ppm_sd": util_db.format_str("[H2O]_ppm_sd")}
                 tag_values['tag_unit'] = 'ppm'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_co2'
-                field_keys = {"      [CO2]_ppm": util_db.format_str("      [CO2]_ppm"),
-                              "   [CO2]_ppm_sd": util_db.format_str("   [CO2]_ppm_sd")}
+                field_keys = {"[CO2]_ppm": util_db.format_str("[CO2]_ppm"),
+                              "[CO2]_ppm_sd": util_db.format_str("[CO2]_ppm_sd")}
                 tag_values['tag_unit'] = 'ppm'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_ch4d'
-                field_keys = {"     [CH4]d_ppm": util_db.format_str("     [CH4]d_ppm"),
-                              "  [CH4]d_ppm_sd": util_db.format_str("  [CH4]d_ppm_sd")}
+                field_keys = {"[CH4]d_ppm": util_db.format_str("[CH4]d_ppm"),
+                              "[CH4]d_ppm_sd": util_db.format_str("[CH4]d_ppm_sd")}
                 tag_values['tag_unit'] = 'ppm'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_co2d'
-                field_keys = {"     [CO2]d_ppm": util_db.format_str("     [CO2]d_ppm"),
-                              "  [CO2]d_ppm_sd": util_db.format_str("  [CO2]d_ppm_sd")}
+                field_keys = {"[CO2]d_ppm": util_db.format_str("[CO2]d_ppm"),
+                              "[CO2]d_ppm_sd": util_db.format_str("[CO2]d_ppm_sd")}
                 tag_values['tag_unit'] = 'ppm'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_gasp'
-                field_keys = {"      GasP_torr": util_db.format_str("      GasP_torr"),
-                              "   GasP_torr_sd": util_db.format_str("   GasP_torr_sd")}
+                field_keys = {"GasP_torr": util_db.format_str("GasP_torr"),
+                              "GasP_torr_sd": util_db.format_str("GasP_torr_sd")}
                 tag_values['tag_unit'] = 'torr'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_gast'
-                field_keys = {"         GasT_C": util_db.format_str("         GasT_C"),
-                              "      GasT_C_sd": util_db.format_str("      GasT_C_sd")}
+                field_keys = {"GasT_C": util_db.format_str("GasT_C"),
+                              "GasT_C_sd": util_db.format_str("GasT_C_sd")}
                 tag_values['tag_unit'] = 'degrees_celcius'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_ambt'
-                field_keys = {"         AmbT_C": util_db.format_str("         AmbT_C"),
-                              "      AmbT_C_sd": util_db.format_str("      AmbT_C_sd")}
+                field_keys = {"AmbT_C": util_db.format_str("AmbT_C"),
+                              "AmbT_C_sd": util_db.format_str("AmbT_C_sd")}
                 tag_values['tag_unit'] = 'degrees_celcius'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
                 # ------------------------------------------------------------ #
                 measurement_name = 'gasanalyser_aux'
-                field_keys = {"         RD0_us": util_db.format_str("         RD0_us"),
-                              "      RD0_us_sd": util_db.format_str("      RD0_us_sd"),
-                              "         RD1_us": util_db.format_str("         RD1_us"),
-                              "      RD1_us_sd": util_db.format_str("      RD1_us_sd"),
-                              "       Fit_Flag": util_db.format_str("       Fit_Flag"),
-                              "      MIU_VALVE": util_db.format_str("      MIU_VALVE"),
-                              "       MIU_DESC": util_db.format_str("       MIU_DESC")}
+                field_keys = {"RD0_us": util_db.format_str("RD0_us"),
+                              "RD0_us_sd": util_db.format_str("RD0_us_sd"),
+                              "RD1_us": util_db.format_str("RD1_us"),
+                              "RD1_us_sd": util_db.format_str("RD1_us_sd"),
+                              "Fit_Flag": util_db.format_str("Fit_Flag"),
+                              "MIU_VALVE": util_db.format_str("MIU_VALVE"),
+                              "MIU_DESC": util_db.format_str("MIU_DESC")}
                 tag_values['tag_unit'] = 'none'
                 df = util_db.filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=True)
-                util_db.ingest_df(measurement_name, df, self.influx_clients)
+                frames.append((measurement_name, df))
 
-                logger.info(f'File {f} ingested.')
+                # All the measurements are sent together:
+                util_db.ingest_dfs(frames, self.influx_clients)
+                self.record_ingested_time(os.path.basename(f), df_all.index.max().timestamp())
+                logger.info(f'File {f} ingested ({df_all.shape[0]} rows).')
+                done.append(data_file)
             except (ValueError, KeyError) as error:
                 logger.info(f"Failed on file: {f}\nError: {error}")
 
+        return done
+
     def rsync_and_ingest(self):
 
         files = self.rsync()
         logger.info('ctd.rsync() finished.')
 
         if files['l0'] is not None:
-            self.ingest_l0(files['l0'])
+            self.mark_processed(self.ingest_l0(files['l0']))
         if files['l1'] is not None:
             # NOTE: we are sending l1 files to the l0 ingester here.
             # l0 is .txt files, l1 is .zip files. We will unzip within .ingest_l0.
-            self.ingest_l0(files['l1'])
+            self.mark_processed(self.ingest_l0(files['l1']))
 
         logger.info('ctd.rsync_and_ingest() finished.')
@@ -13,7 +13,7 @@ import influxdb_client
 
 import config
 import util_az
-import util_db
+import util_cache
 import util_file
 
 '''
@@ -29,7 +29,7 @@ def make_subplot(df, key, label):
 
 def make_weather_plots(filename="weather_1d.html", upload_to_az=True):
 
-    standard_timeslice = 'time > now() - 1d'
+    standard_period = datetime.timedelta(days=1)
     standard_downsample = 'time(1m)'  # To turn off use: False
     plot_data = [
         {
@@ -37,7 +37,7 @@ def make_weather_plots(filename="weather_1d.html", upload_to_az=True):
             'ylabel': 'Temperature [deg]',
             'measurement': 'meteo_temperature_munkholmen',
             'variable': 'temperature',
-            'timeslice': standard_timeslice,
+            'period': standard_period,
             'lower_filter': -30,
             'upper_filter': 50,
             'downsample': standard_downsample,
@@ -47,7 +47,7 @@ def make_weather_plots(filename="weather_1d.html", upload_to_az=True):
             'ylabel': 'Wind speed [m/s]',
             'measurement': 'meteo_wind_speed_munkholmen',
             'variable': 'wind_speed',
-            'timeslice': standard_timeslice,
+            'period': standard_period,
             'lower_filter': 0,
             'upper_filter': 100,
             'downsample': standard_downsample,
@@ -57,7 +57,7 @@ def make_weather_plots(filename="weather_1d.html", upload_to_az=True):
             'ylabel': 'Wind direction [deg]',
             'measurement': 'meteo_wind_direction_munkholmen',
             'variable': 'wind_direction',
-            'timeslice': standard_timeslice,
+            'period': standard_period,
             'lower_filter': 0,
             'upper_filter': 360,
             'downsample': standard_downsample,
@@ -67,7 +67,7 @@ def make_weather_plots(filename="weather_1d.html", upload_to_az=True):
             'ylabel': 'Humidity [%]',
             'measurement': 'meteo_humidity_munkholmen',
             'variable': 'humidity',
-            'timeslice': standard_timeslice,
+            'period': standard_period,
             'lower_filter': 0,
             'upper_filter': 100,
             'downsample': standard_downsample,
@@ -83,9 +83,11 @@ def make_weather_plots(filename="weather_1d.html", upload_to_az=True):
 
     fig = make_subplots(rows=len(plot_data), cols=1, subplot_titles=[p['title'] for p in plot_data])
     fig.update_layout(template='plotly_white')
+    now = datetime.datetime.now(datetime.timezone.utc)
     for i, p in enumerate(plot_data):
-        df = util_db.query_influxdb(
-            client, p['measurement'], p['timeslice'],
+        df = util_cache.cached_query_influxdb(
+            client, p['measurement'],
+            (now - p['period']).strftime('%Y-%m-%dT%H:%M:%SZ'), now.strftime('%Y-%m-%dT%H:%M:%SZ'),
             variable=p['variable'], downsample=p['downsample'], approved='yes')
 
         # Simple simple filtering:
@@ -125,20 +127,24 @@ def adcp_raw_data_to_array(df, n_bins, n_beams):
     return time, arr
 
 
-def query_influx_table(measurement, timespan):
+FLUX_URL = "https://oceanlab.azure.sintef.no:8086"
+FLUX_BUCKET = "oceanlab/autogen"
+
+
+def _query_influx_table(measurement, start_time, stop_time):
 
     influx_user, influx_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_read_credentials'))
-    bucket = "oceanlab/autogen"
     token = f"{influx_user}:{influx_pwd}"
-    url = "https://oceanlab.azure.sintef.no:8086"
 
-    query = f'''from(bucket:"{bucket}")
- |> range({timespan})
+    query = f'''from(bucket:"{FLUX_BUCKET}")
+ |> range(start: {start_time}, stop: {stop_time})
  |> filter(fn:(r) => r._measurement == "{measurement}")'''
 
-    with influxdb_client.InfluxDBClient(url=url, token=token) as client:
+    with influxdb_client.InfluxDBClient(url=FLUX_URL, token=token) as client:
         result = client.query_api().query(query=query)
 
+    if not result:
+        return pd.DataFrame()
     n_time = len(result[0].records)
     n_vars = len(result)
     times = []
@@ -155,6 +161,18 @@ def query_influx_table(measurement, timespan):
     return pd.DataFrame(data=vals, index=times, columns=var_names)
 
 
+def query_influx_table(measurement, start_time, stop_time):
+    '''
+    All the fields of a measurement between start_time and stop_time (str
+    of the form: '2022-07-15T00:00:00Z'), in a df indexed by time.
+    Complete time windows are taken from the query cache (see util_cache.py).
+    '''
+    return util_cache.cached_query(
+        (measurement, FLUX_URL, FLUX_BUCKET),
+        lambda start, stop: _query_influx_table(measurement, start, stop),
+        start_time, stop_time, time_col=None)
+
+
 def make_adcp_plots_all(upload_to_az=True):
 
     n_bins = 28
@@ -163,16 +181,14 @@ def make_adcp_plots_all(upload_to_az=True):
     cell_size = 3
     start_time = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime('%Y-%m-%dT%H:%M:%SZ')
     stop_time = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
-    time_range = f'start: {start_time}, stop: {stop_time}'
-    # print(time_range)
 
     # Get the data and put into arrays:
     # data arrays have shape: [time, bins, beams]
-    df = query_influx_table('signature_100_velocity_munkholmen', time_range)
+    df = query_influx_table('signature_100_velocity_munkholmen', start_time, stop_time)
     times, velocity = adcp_raw_data_to_array(df, n_bins, n_beams)
-    df = query_influx_table('signature_100_correlation_munkholmen', time_range)
+    df = query_influx_table('signature_100_correlation_munkholmen', start_time, stop_time)
     times_c, correlation = adcp_raw_data_to_array(df, n_bins, n_beams)
-    df = query_influx_table('signature_100_amplitude_munkholmen', time_range)
+    df = query_influx_table('signature_100_amplitude_munkholmen', start_time, stop_time)
     times_a, amplitude = adcp_raw_data_to_array(df, n_bins, n_beams)
 
     for a in [amplitude, correlation, velocity]:
@@ -185,7 +201,7 @@ def make_adcp_plots_all(upload_to_az=True):
             df.loc[i, :] = np.nan
         df.drop(np.setdiff1d(df.index, idx), axis=0, inplace=True)
         return df
-    df_pressure = query_influx_table('signature_100_pressure_munkholmen', time_range)
+    df_pressure = query_influx_table('signature_100_pressure_munkholmen', start_time, stop_time)
     # Make sure that the pressure values are present at ever point where we have data values.
     df_pressure = add_remove_by_index(df.index, df_pressure)
 
@@ -281,12 +297,10 @@ def make_velocity_plots(days=2, upload_to_az=True):
     cell_size = 3
     start_time = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
     stop_time = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%SZ')
-    time_range = f'start: {start_time}, stop: {stop_time}'
-    # print(time_range)
 
     # Get the data and put into arrays:
     # data arrays have shape: [time, bins, beams]
-    df = query_influx_table('signature_100_velocity_munkholmen', time_range)
+    df = query_influx_table('signature_100_velocity_munkholmen', start_time, stop_time)
     times, velocity = adcp_raw_data_to_array(df, n_bins, n_beams)
 
     velocity[velocity == -32.77] = np.nan
@@ -297,7 +311,7 @@ def make_velocity_plots(days=2, upload_to_az=True):
             df.loc[i, :] = np.nan
         df.drop(np.setdiff1d(df.index, idx), axis=0, inplace=True)
         return df
-    df_pressure = query_influx_table('signature_100_pressure_munkholmen', time_range)
+    df_pressure = query_influx_table('signature_100_pressure_munkholmen', start_time, stop_time)
     # Make sure that the pressure values are present at ever point where we have data values.
     df_pressure = add_remove_by_index(df.index, df_pressure)
 
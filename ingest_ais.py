@@ -1,8 +1,7 @@
-import os
 from datetime import datetime
-from influxdb import InfluxDBClient
 
 import config
+import util_db
 import util_file
 from ais import AIS
 
@@ -16,11 +15,12 @@ def main():
     logger.info("\n\n------ Starting sync/ingest.")
 
     logger.info("Fetching the influxdb clients.")
-    admin_user, admin_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_admin_credentials'))
     clients = [
-        InfluxDBClient(config.az_influx_pc, 8086, admin_user, admin_pwd, 'example'),
-        InfluxDBClient(config.sintef_influx_pc, 8086, admin_user, admin_pwd, 'example'),
+        util_db.get_influx_client(config.az_influx_pc, 'example'),
+        util_db.get_influx_client(config.sintef_influx_pc, 'example'),
     ]
+    logger.info("Writing any spooled data from earlier runs.")
+    util_db.replay_spool(clients)
 
     ais = AIS(influx_clients=clients)
     ais.ingest_l0()
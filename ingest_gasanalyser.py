@@ -1,8 +1,7 @@
-import os
 from datetime import datetime
-from influxdb import InfluxDBClient
 
 import config
+import util_db
 import util_file
 from gas_analyser import GasAnalyser
 
@@ -16,13 +15,14 @@ def main():
     logger.info("\n\n------ Starting sync/ingest.")
 
     logger.info("Fetching the influxdb clients.")
-    admin_user, admin_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_admin_credentials'))
     methane_client = [
-        InfluxDBClient(config.az_influx_pc, 8086, admin_user, admin_pwd, 'methane_private'),
+        util_db.get_influx_client(config.az_influx_pc, 'methane_private'),
     ]
+    logger.info("Writing any spooled data from earlier runs.")
+    util_db.replay_spool(methane_client)
 
-    gas = GasAnalyser(influx_clients=methane_client)
-    gas.rsync_and_ingest()
+    with GasAnalyser(influx_clients=methane_client) as gas:
+        gas.rsync_and_ingest()
 
 
 if __name__ == "__main__":
@@ -1,97 +1,263 @@
 import os
+import re
 import datetime
-import subprocess
+import collections
 import time
-import paramiko
-from influxdb import InfluxDBClient
+from concurrent.futures import ProcessPoolExecutor
 
 import config
 import loggernet
+import util_db
 import util_file
 
 # I couldn't install rsync on the cmd prompt on the remote
 # (although I could on git bash...) but since I could get
-# standard ssh, this imitates a custom "rsync" with scp and rm.
+# standard ssh, this imitates a custom "rsync" with sftp and Del.
+# All of it is done over one ssh connection (util_file.RemoteSession).
 
+# file_basename, timestamp and any "_X" (multiple files with same timestamp, from LoggerNet).
+FILE_NAME_PATTERN = re.compile(r'^(.*_)(\d{4}_\d{2}_\d{2}_\d{4})(_\d+)?\.dat$')
 
-def dir_remote(username, address):
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(address, username=username)
 
-    command = f"cd c:\\Users\{config.loggernet_user}\LoggerNet_output&&dir"
-    stdin, stdout, stderr = ssh.exec_command(command)
+def remote_path(filename=''):
+    '''Path of filename in config.loggernet_outbox, as used over sftp.'''
+    return config.loggernet_outbox.replace('\\', '/') + '/' + filename
 
-    return stdout.read().decode(errors='ignore'), stderr.read().decode(errors='ignore')
 
+def list_remote(session):
+    '''
+    Lists config.loggernet_outbox.
 
-def move_remote(username, address, filename):
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(address, username=username)
+    Returns
+    -------
+    list
+        Of paramiko.SFTPAttributes, with filename, st_size and st_mtime.
+    '''
+    return session.listdir_attr(remote_path())
 
-    command = f"move c:\\Users\{config.loggernet_user}\LoggerNet_output\\{filename} c:\\Users\{config.loggernet_user}\LoggerNet_output\duplicate_data"
-    stdin, stdout, stderr = ssh.exec_command(command)
 
-    return stdout.read().decode(errors='ignore'), stderr.read().decode(errors='ignore')
+def index_remote_files(entries, file_basenames, logger):
+    '''
+    Sorts the files in the listing of the outbox by file basename.
 
+    Full files should be something like file_basename2021_11_01_0930.dat
+    but they can also have an "_1" before the file extension (multiple
+    files with same timestamp, from LoggerNet).
 
-def scp_file(username, address, file_path, destination, timeout=240):
-    '''
     Parameters
     ----------
-    file_path : str
-        Note can be relative to the USERNAME's home directory on that pc
-        or the full path.
+    entries : list
+        Of paramiko.SFTPAttributes, see list_remote()
+    file_basenames : list
+        Start of the full LoggerNet filenames (without timestamp and extension)
+    logger
+        The logger object
+
+    Returns
+    -------
+    dict
+        file_basename : list of the paramiko.SFTPAttributes of its files,
+        sorted by name (i.e. time).
     '''
-    process = subprocess.Popen(
-        ['scp', '-T', username + '@' + address + ":" + file_path, destination],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE)
-    process.wait(timeout=timeout)
+    files = {basename: [] for basename in file_basenames}
+    for entry in entries:
+        match = FILE_NAME_PATTERN.match(entry.filename)
+        if match is not None and match.group(1) in files:
+            files[match.group(1)].append(entry)
+        elif entry.filename.startswith(tuple(file_basenames)):
+            logger.warning(f"This file shouldn't be here: {entry.filename}")
+    for basename in files:
+        files[basename].sort(key=lambda entry: entry.filename)
+    return files
 
 
-def get_file_list(dir_output, file_basename, logger):
-    '''Finds files that start with file_basename within dir_output.
+def run_remote_batched(session, commands, max_length=7000):
+    '''
+    Runs the cmd commands in config.loggernet_outbox, as few ssh commands as
+    possible (cmd limits a command line to 8191 characters). The commands
+    are grouped after the cd, so none run if the cd fails ('&' binds more
+    loosely than '&&').
 
-    Full files should be something like file_basename2021_11_01_0930.dat
-    but they can also have an "_1" before the file extension.
+    Returns
+    -------
+    str
+        stderr of the commands.
+    '''
+    errors = []
+    cd = f'cd /d "{config.loggernet_outbox}" && '
+    while commands:
+        n = 1
+        while n < len(commands) and len(cd) + len(' & '.join(commands[:n + 1])) + 2 <= max_length:
+            n += 1
+        stdout, stderr = session.run(cd + '(' + ' & '.join(commands[:n]) + ')')
+        errors.append(stderr)
+        commands = commands[n:]
+    return ''.join(errors)
+
+
+def tidy_remote(session, to_delete, to_move, logger):
+    '''
+    Deletes the files to_delete, and moves the files to_move to
+    'duplicate_data', on the loggernet pc. All the files are done in one
+    batch, which is retried (for the files still there) up to
+    config.logpc_ssh_max_attempts times.
 
     Parameters
     ----------
-    dir_output : string
-        output of the 'dir' command on the correct directory on the loggenet PC
-    file_basename : string
-        Start of the full LoggerNet filename (without timestamp and extension)
+    session : util_file.RemoteSession
+        Connection to the loggernet pc.
+    to_delete : list
+        File names in config.loggernet_outbox
+    to_move : list
+        File names in config.loggernet_outbox
     logger
-        The logger object
+
     Returns
     -------
     list
-        List of file names
+        The files that are still in config.loggernet_outbox.
     '''
-
-    files = []
-    dir_string = dir_output
-    name_length = len(file_basename) + 19  # deal with '_X' files later
-    while True:
-        start = dir_string.find(file_basename)
-        if start == -1:
+    remaining = set(to_delete) | set(to_move)
+    i = 0
+    while remaining:
+        commands = [f'del "{f}"' for f in to_delete if f in remaining] \
+            + [f'move /Y "{f}" duplicate_data' for f in to_move if f in remaining]
+        try:
+            stderr = run_remote_batched(session, commands)
+            if stderr:
+                logger.warning(f"Removing files from {config.loggernet_pc} gave: {stderr}")
+            remaining &= {entry.filename for entry in list_remote(session)}
+        except Exception as e:
+            logger.warning(f"Removing files from {config.loggernet_pc} failed with: {e!r}")
+        if not remaining or i == config.logpc_ssh_max_attempts:
             break
-        # Now deal with multiple files with same timestamp, '_X', from LoggerNet.
-        if dir_string[start + name_length - 4:start + name_length] == '.dat':
-            f_name = dir_string[start:start + name_length]
-        else:
-            f_name = dir_string[start:start + name_length + 2]
-            if f_name[-4:] != '.dat':
-                logger.warning(f"This file shouldn't be here: {f_name}")
-        files.append(f_name)
-        dir_string = dir_string[start + len(f_name):]
+        logger.warning(f"{len(remaining)} files not removed from {config.loggernet_pc}. Will try again.")
+        time.sleep(2)
+        i += 1
 
-    return files
+    for f in sorted(remaining):
+        msg = f"File {f} could not be {'deleted' if f in to_delete else 'moved to duplicate_data'}. Ignoring (this may cause build up of files on sintefutv012)."
+        logger.error(msg)
+        print(msg)
+    n_done = len(to_delete) + len(to_move) - len(remaining)
+    logger.info(f"{n_done} files removed from {config.loggernet_pc}.")
+    return sorted(remaining)
 
 
-def main():
+def copy_file(session, filename, destination, logger, size=None):
+    '''
+    Copies filename from config.loggernet_outbox to the destination dir.
+    Errors are logged, the caller checks that the file arrived. If size is
+    given, a copy of any other size is removed.
+    '''
+    local_path = os.path.join(destination, filename)
+    try:
+        session.get(remote_path(filename), local_path)
+    except Exception as e:
+        logger.warning(f"Copying file {filename} failed with: {e!r}")
+        return
+    if size is not None and os.path.getsize(local_path) != size:
+        logger.warning(f"Copy of file {filename} is {os.path.getsize(local_path)} bytes, not {size}.")
+        os.remove(local_path)
+
+
+def fetch_file(session, f, logger, size=None):
+    '''
+    Copies a file from the loggernet pc to config.loggernet_inbox, retrying
+    up to config.logpc_ssh_max_attempts times. If size is given, the copy
+    must be of that size.
+
+    Returns
+    -------
+    str or None
+        Path of the local copy, None if the file wasn't copied.
+    '''
+    # ---- Copy over file:
+    i = 0
+    copy_file(session, f, config.loggernet_inbox, logger, size)
+    if not os.path.isfile(os.path.join(config.loggernet_inbox, f)):
+        logger.warning(f'Error: File {f} not copied.')
+        while i < config.logpc_ssh_max_attempts:
+            logger.info("Will try again.")
+            time.sleep(2)
+            copy_file(session, f, config.loggernet_inbox, logger, size)
+            if os.path.isfile(os.path.join(config.loggernet_inbox, f)):
+                break
+            logger.warning(f'Error: File {f} not copied.')
+            i += 1
+    if i == config.logpc_ssh_max_attempts:
+        msg = f"Max tries exceeded. File {f} could not be copied. Exiting."
+        logger.error(msg)
+        print(msg)
+        return None
+
+    return os.path.join(config.loggernet_inbox, f)
+
+
+def set_aside_failed(f, logger):
+    '''
+    Called when ingesting file f failed: its local copy is moved from
+    config.loggernet_inbox to config.loggernet_failed (to be looked at),
+    and the file is left on the loggernet pc, so it is tried again next
+    run (rather than taken for a duplicate).
+    '''
+    logger.exception(f"Ingesting file {f} failed, it is left on {config.loggernet_pc} to be tried again.")
+    local_file = os.path.join(config.loggernet_inbox, f)
+    if os.path.isfile(local_file):
+        os.makedirs(config.loggernet_failed, exist_ok=True)
+        os.replace(local_file, os.path.join(config.loggernet_failed, f))
+
+
+def ingest_parsed(pending, ingested, clients, logger, wait=False):
+    '''
+    Ingests the files that have been parsed in the process pool, and adds
+    them to ingested (to be removed from the loggernet pc). Files that
+    failed are set aside, see set_aside_failed().
+
+    pending holds, for each file type, a queue of (file, future) in the
+    order the files were copied. Files are only taken from the front of
+    each queue, so the files of a file type are ingested in order.
+
+    Parameters
+    ----------
+    pending : dict
+        file_type : collections.deque of (file name, concurrent.futures.Future)
+    ingested : list
+        File names
+    clients : list
+        Of influxdb.InfluxDBClient
+    logger
+    wait : bool
+        If True wait for, and ingest, all the pending files. Otherwise only
+        those already parsed.
+    '''
+    for file_type, queue in pending.items():
+        while queue and (wait or queue[0][1].done()):
+            f, future = queue.popleft()
+            try:
+                frames = future.result()
+                util_db.ingest_dfs(frames, clients)
+            except Exception:
+                set_aside_failed(f, logger)
+                continue
+            logger.info(f'Data for file {f} added to influxDB.')
+            ingested.append(f)
+
+
+def main(parse_workers=config.loggernet_parse_workers):
+    '''
+    Copies, ingests and then removes the files from the loggernet pc.
+
+    If parse_workers > 1 the files are parsed in a pool of that many
+    processes, while the next files are being copied. Each file is
+    ingested once it has been parsed, and the files of each file type are
+    still ingested in order.
+
+    The ingested files are deleted from the loggernet pc (and those already
+    on this machine moved to 'duplicate_data') together at the end of the
+    run. If the run fails before then, the ingested files will be found
+    on this machine next run, and moved to 'duplicate_data'.
+    '''
 
     print("Starting running ingest_loggernet.py at "
           + datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
@@ -100,85 +266,90 @@ def main():
     logger.info("\n\n------ Starting data collection in main()")
 
     logger.info("Fetching the influxdb clients.")
-    admin_user, admin_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_admin_credentials'))
     clients = [
-        InfluxDBClient(config.az_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab'),
-        InfluxDBClient(config.sintef_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab'),
+        util_db.get_influx_client(config.az_influx_pc, 'oceanlab'),
+        util_db.get_influx_client(config.sintef_influx_pc, 'oceanlab'),
     ]
-    # ---- List files in the remote directory:
-    stdout, stderr = dir_remote(config.loggernet_user, config.loggernet_pc)
+    logger.info("Writing any spooled data from earlier runs.")
+    util_db.replay_spool(clients)
 
-    for file_type in config.loggernet_files_basenames:
+    pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 1 else None
+    pending = {}
+    ingested = []
+    duplicates = []
 
-        # ---- Get a list of files of the current file_type:
-        files = get_file_list(stdout, file_type, logger)
-        logger.info(f'{len(files)} files found on {config.loggernet_pc} for file type: {file_type}.')
+    try:
+        with util_file.RemoteSession(config.loggernet_user, config.loggernet_pc, timeout=config.logpc_ssh_timeout) as session:
 
-        if len(files) < 2:
-            logger.info(f"No new files to be ingested for file type: {file_type}.")
-            continue
+            # ---- List files in the remote directory:
+            remote_files = index_remote_files(list_remote(session), config.loggernet_files_basenames, logger)
+            settled_before = time.time() - config.loggernet_settle.total_seconds()
 
-        # print(f"Number of files: {len(files)}")
+            for file_type in config.loggernet_files_basenames:
 
-        # ---- scp the files over, then delete
-        for f in files[:-1]:  # Don't copy the latest file - it might be being written to.
+                # ---- Get a list of files of the current file_type:
+                files = remote_files[file_type]
+                logger.info(f'{len(files)} files found on {config.loggernet_pc} for file type: {file_type}.')
 
-            logger.info(f"Ingesting file: {f}")
+                if len(files) < 2:
+                    logger.info(f"No new files to be ingested for file type: {file_type}.")
+                    continue
 
-            # Check we don't have a version of the file locally.
-            if os.path.isfile(os.path.join(config.loggernet_inbox, f)):
-                logger.warning(f"File {f} to be copied already exists on this machine, moving to duplicate_data and skipping.")
-                print(f"Warning: File {f} found already on this machine. Skipping. Moved to 'duplicate_data'.")
-                stdout, stderr = move_remote(config.loggernet_user, config.loggernet_pc, f)
-                logger.info(f"File move output: {stdout}")
-                if stderr:
-                    logger.warning(f"File {f} move not successful with message: {stderr}")
-                continue
+                # print(f"Number of files: {len(files)}")
 
-            # ---- scp over file:
-            i = 0
-            scp_file(
-                config.loggernet_user, config.loggernet_pc,
-                config.loggernet_outbox + "\\" + f, config.loggernet_inbox)
-            if not os.path.isfile(os.path.join(config.loggernet_inbox, f)):
-                logger.warning(f'Error: File {f} not copied.')
-                while i < config.logpc_ssh_max_attempts:
-                    logger.info("Will try again.")
-                    time.sleep(2)
-                    scp_file(
-                        config.loggernet_user, config.loggernet_pc,
-                        config.loggernet_outbox + "\\" + f, config.loggernet_inbox)
-                    if os.path.isfile(os.path.join(config.loggernet_inbox, f)):
-                        break
-                    logger.warning(f'Error: File {f} not copied.')
-                    i += 1
-            if i == config.logpc_ssh_max_attempts:
-                msg = f"Max tries exceeded. File {f} could not be copied. Exiting."
-                logger.error(msg)
-                print(msg)
-                continue
+                # ---- Copy the files over and ingest them
+                for entry in files[:-1]:  # Don't copy the latest file - it might be being written to.
+                    f = entry.filename
 
-            # ---- Ingest the file:
-            loggernet.ingest_loggernet_file(os.path.join(config.loggernet_inbox, f), file_type, clients)
-            logger.info(f'Data for file {f} added to influxDB.')
+                    logger.info(f"Ingesting file: {f}")
+
+                    if entry.st_mtime > settled_before:
+                        logger.info(f"File {f} was modified in the last {config.loggernet_settle}, leaving it to the next run.")
+                        continue
 
-            # ---- Remove the file from the origin PC (sintefutv012)
-            i = 0
-            rm_output = os.popen(f'''ssh {config.loggernet_user}@{config.loggernet_pc} "Del {config.loggernet_outbox}\\{f}"''').read()
-            if rm_output:
-                logger.warning("Remove original file failed.")
-                while i < config.logpc_ssh_max_attempts:
-                    logger.info("Will try again.")
-                    time.sleep(2)
-                    rm_output = os.popen(f'''ssh {config.loggernet_user}@{config.loggernet_pc} "Del {config.loggernet_outbox}\\{f}"''').read()
-                    if not rm_output:
-                        break
-                    logger.warning(f'Error: File {f} not copied.')
-                    i += 1
-            if i == config.logpc_ssh_max_attempts:
-                msg = "Max tries exceeded. Ignoring (this may cause build up of files on sintefutv012)."
-                logger.error(msg)
-                print(msg)
+                    # Check we don't have a version of the file locally.
+                    if os.path.isfile(os.path.join(config.loggernet_inbox, f)):
+                        logger.warning(f"File {f} to be copied already exists on this machine, moving to duplicate_data and skipping.")
+                        print(f"Warning: File {f} found already on this machine. Skipping. Moved to 'duplicate_data'.")
+                        duplicates.append(f)
+                        continue
+
+                    local_file = fetch_file(session, f, logger, entry.st_size)
+                    if local_file is None:
+                        continue
+
+                    if pool is None:
+                        # ---- Ingest the file:
+                        try:
+                            loggernet.ingest_loggernet_file(local_file, file_type, clients)
+                        except Exception:
+                            set_aside_failed(f, logger)
+                            continue
+                        logger.info(f'Data for file {f} added to influxDB.')
+                        ingested.append(f)
+                    else:
+                        future = pool.submit(loggernet.parse_loggernet_file, local_file, file_type)
+                        pending.setdefault(file_type, collections.deque()).append((f, future))
+                        ingest_parsed(pending, ingested, clients, logger)
+
+            if pool is not None:
+                ingest_parsed(pending, ingested, clients, logger, wait=True)
+
+            # ---- Remove the ingested files from the origin PC (sintefutv012)
+            tidy_remote(session, ingested, duplicates, logger)
+    except BaseException:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+            # The files copied but not ingested are still on the loggernet pc. Their local copies
+            # are removed, so they are copied again next run rather than taken for duplicates:
+            for queue in pending.values():
+                for f, _ in queue:
+                    local_file = os.path.join(config.loggernet_inbox, f)
+                    if os.path.isfile(local_file):
+                        os.remove(local_file)
+        raise
+    if pool is not None:
+        pool.shutdown()
 
     logger.info("All files transferred and ingested successfully, exiting.")
 
@@ -1,8 +1,7 @@
-import os
 from datetime import datetime
-from influxdb import InfluxDBClient
 
 import config
+import util_db
 import util_file
 from ctd import CTD
 # from gas_analyser import GasAnalyser
@@ -19,14 +18,15 @@ def main():
     logger.info("\n\n------ Starting sync/ingest.")
 
     logger.info("Fetching the influxdb clients.")
-    admin_user, admin_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_admin_credentials'))
     open_clients = [
-        InfluxDBClient(config.az_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab'),
-        InfluxDBClient(config.sintef_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab'),
+        util_db.get_influx_client(config.az_influx_pc, 'oceanlab'),
+        util_db.get_influx_client(config.sintef_influx_pc, 'oceanlab'),
     ]
+    logger.info("Writing any spooled data from earlier runs.")
+    util_db.replay_spool(open_clients)
 
-    ctd = CTD(influx_clients=open_clients)
-    ctd.rsync_and_ingest()
+    with CTD(influx_clients=open_clients) as ctd:
+        ctd.rsync_and_ingest()
 
     # lisst = Lisst_200(influx_clients=open_clients)
     # lisst.rsync_and_ingest()
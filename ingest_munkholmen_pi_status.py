@@ -1,8 +1,7 @@
-import os
 from datetime import datetime
-from influxdb import InfluxDBClient
 
 import config
+import util_db
 import util_file
 from munkholmen_pi_status import Munkholmen_Pi
 
@@ -16,14 +15,15 @@ def main():
     logger.info("\n\n------ Starting sync/ingest.")
 
     logger.info("Fetching the influxdb clients.")
-    admin_user, admin_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_admin_credentials'))
     clients = [
-        InfluxDBClient(config.az_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab'),
-        InfluxDBClient(config.sintef_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab')
+        util_db.get_influx_client(config.az_influx_pc, 'oceanlab'),
+        util_db.get_influx_client(config.sintef_influx_pc, 'oceanlab')
     ]
+    logger.info("Writing any spooled data from earlier runs.")
+    util_db.replay_spool(clients)
 
-    pi_status = Munkholmen_Pi(influx_clients=clients)
-    pi_status.rsync_and_ingest()
+    with Munkholmen_Pi(influx_clients=clients) as pi_status:
+        pi_status.rsync_and_ingest()
 
 
 if __name__ == "__main__":
@@ -1,10 +1,8 @@
-import os
 import datetime
 import numpy as np
 import pandas as pd
 import sqlalchemy as db
 from urllib.parse import quote_plus as url_quote
-from influxdb import InfluxDBClient
 
 import config
 import util_db
@@ -58,11 +56,12 @@ def main():
         exit()
 
     logger.info("Fetching the influxdb clients.")
-    admin_user, admin_pwd = util_file.get_user_pwd(os.path.join(config.secrets_dir, 'influx_admin_credentials'))
     clients = [
-        InfluxDBClient(config.az_influx_pc, 8086, admin_user, admin_pwd, 'oceanlab'),
-        InfluxDBClient(config.sintef_influx_pc, 8086, admin_user, admin_pwd, 'test'),
+        util_db.get_influx_client(config.az_influx_pc, 'oceanlab'),
+        util_db.get_influx_client(config.sintef_influx_pc, 'test'),
     ]
+    logger.info("Writing any spooled data from earlier runs.")
+    util_db.replay_spool(clients)
 
     cols = db.inspect(engine).get_columns('wind_sensors')  # This is the db schema
     col_names = [c['name'] for c in cols]
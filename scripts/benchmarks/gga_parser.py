@@ -0,0 +1,79 @@
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+import util_db
+import gas_analyser
+
+'''
+Benchmark of gas_analyser.read_gga(), the parser of the LGR-UGGA gas
+analyser files (gga_*.txt), on a year of archived files. Compares it to
+the old path in GasAnalyser.ingest_l0(): pd.read_csv(), then
+util_db.force_float_cols(error_to_nan=True) and pd.to_datetime() with the
+padded format.
+
+The files are synthetic: N_DAYS files of ROWS_PER_FILE rows (0.1 Hz),
+with the padding of the real files and a few values that aren't numbers.
+'''
+
+N_DAYS = 365
+ROWS_PER_FILE = 8640
+
+COLS = ['[CH4]_ppm', '[CH4]_ppm_sd', '[H2O]_ppm', '[H2O]_ppm_sd', '[CO2]_ppm', '[CO2]_ppm_sd',
+        '[CH4]d_ppm', '[CH4]d_ppm_sd', '[CO2]d_ppm', '[CO2]d_ppm_sd', 'GasP_torr', 'GasP_torr_sd',
+        'GasT_C', 'GasT_C_sd', 'AmbT_C', 'AmbT_C_sd', 'RD0_us', 'RD0_us_sd', 'RD1_us', 'RD1_us_sd',
+        'Fit_Flag', 'MIU_VALVE', 'MIU_DESC']
+
+
+def write_files(directory):
+    '''Writes the files, returns their paths.'''
+    rng = np.random.default_rng(0)
+    header = 'VC:f58 BD:Jan 16 2014 SN:\n' + ','.join(['Time'.rjust(25)] + [c.rjust(15) for c in COLS]) + '\n'
+    # The values of the rows of a file, the times are added per file:
+    values = rng.uniform(0, 1000, (ROWS_PER_FILE, len(COLS) - 1))
+    rows = []
+    for i in range(ROWS_PER_FILE):
+        v = [f'{x:15.6e}' for x in values[i]] + ['Valve1'.rjust(15)]
+        if i % 997 == 0:
+            v[2] = 'nan'.rjust(15)
+        rows.append(','.join(v))
+
+    files = []
+    for day in pd.date_range('2022-01-10', periods=N_DAYS, freq='D', tz='UTC'):
+        path = os.path.join(directory, f"gga_{day.strftime('%Y-%m-%d')}_f0000.txt")
+        # The files are in local time, with the DST changes:
+        times = pd.date_range(day, periods=ROWS_PER_FILE, freq='10s').tz_convert('CET')
+        times = times.strftime('  %d/%m/%Y %H:%M:%S.000')
+        with open(path, 'w') as f:
+            f.write(header + '\n'.join(t + ',' + r for t, r in zip(times, rows)) + '\n')
+        files.append(path)
+    return files
+
+
+def old_read(path):
+    df_all = pd.read_csv(path, sep=',', skiprows=1)
+    time_col = '                     Time'
+    df_all = util_db.force_float_cols(df_all, not_float_cols=[time_col], error_to_nan=True)
+    df_all[time_col] = pd.to_datetime(df_all[time_col], format='  %d/%m/%Y %H:%M:%S.%f')
+    return df_all.set_index(time_col).tz_localize('CET', ambiguous='infer').tz_convert('UTC')
+
+
+def bench(name, func, files):
+    t = time.perf_counter()
+    n_rows = sum(func(f).shape[0] for f in files)
+    t = time.perf_counter() - t
+    print(f"{name:>20}: {n_rows / t:12.0f} rows/s ({t:.1f} s for {len(files)} files)")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Writing {N_DAYS} files of {ROWS_PER_FILE} rows.")
+        files = write_files(directory)
+        bench('old', old_read, files)
+        bench('read_gga', gas_analyser.read_gga, files)
+
+
+if __name__ == "__main__":
+    main()
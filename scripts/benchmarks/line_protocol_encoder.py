@@ -0,0 +1,71 @@
+import time
+import numpy as np
+import pandas as pd
+
+import util_db
+
+'''
+Benchmark of util_db.df_to_line_protocol(), the encoder used by
+util_db.ingest_df(). Compares it to building the list of point dicts
+row by row (the old ingest_df() path). Note the dict timings do not even
+include the encoding that influxdb.InfluxDBClient.write_points() then
+does on those dicts.
+
+Two frame shapes are used:
+    narrow: a day of 1 Hz data with a single field (like the CTD tables)
+    wide: a day of 2 min data with ~450 fields (like signature_100 from loggernet)
+'''
+
+
+def make_df(n_rows, n_fields, freq):
+    idx = pd.date_range('2022-07-01', periods=n_rows, freq=freq, tz='UTC')
+    # Values with a typical sensor resolution (two decimal places):
+    data = np.round(np.random.default_rng(0).normal(10, 5, size=(n_rows, n_fields)), 2)
+    df = pd.DataFrame(data, index=idx, columns=[f'field_{i}' for i in range(n_fields)])
+    tag_values = {'tag_sensor': 'ctd',
+                  'tag_edge_device': 'munkholmen_topside_pi',
+                  'tag_platform': 'munkholmen',
+                  'tag_data_level': 'raw',
+                  'tag_approved': 'no',
+                  'tag_unit': 'none'}
+    return util_db.add_tags(df, tag_values)
+
+
+def dict_points(measurement, df):
+    tag_cols = [c for c in df.columns if c[:4] == 'tag_']
+    field_cols = [c for c in df.columns if c not in tag_cols]
+    data = []
+    for index, row in df.iterrows():
+        data.append({
+            'measurement': measurement,
+            'time': index,
+            'tags': {t[4:]: row[t] for t in tag_cols},
+            'fields': {f: row[f] for f in field_cols},
+        })
+    return data
+
+
+def timeit(func, df):
+    t = time.perf_counter()
+    func('benchmark', df)
+    return time.perf_counter() - t
+
+
+def bench(name, func, df, repeats=3):
+    t = min(timeit(func, df) for _ in range(repeats))
+    print(f"{name:>30}: {df.shape[0] / t:12.0f} rows/s ({t:.3f} s)")
+
+
+def main():
+    frames = {
+        'narrow (86400 x 1)': make_df(86400, 1, '1s'),
+        'wide (720 x 450)': make_df(720, 450, '2min'),
+    }
+    for name, df in frames.items():
+        print(name)
+        bench('dict points (iterrows)', dict_points, df, repeats=1)
+        bench('df_to_line_protocol', util_db.df_to_line_protocol, df)
+
+
+if __name__ == "__main__":
+    main()
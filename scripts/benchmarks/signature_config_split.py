@@ -0,0 +1,56 @@
+import time
+import pandas as pd
+
+import util_db
+import loggernet
+
+'''
+Benchmark of the parsing of the signature_100 configuration strings (last
+col of the CR6_EOL2p0_Current_ loggernet files) into the
+signature_100_configuration_munkholmen and
+signature_100_depth_config_munkholmen measurements. Compares the row by
+row split (the old code) to loggernet._signature_100_config_munkholmen().
+'''
+
+
+def make_df(n_rows):
+    idx = pd.date_range('2022-07-01', periods=n_rows, freq='2min', tz='UTC')
+    config_str = [f'PNORI,4,Signature100_{i % 3},4,28,2.00,{3 + i % 2}.00,0*2E' for i in range(n_rows)]
+    return pd.DataFrame({'ADCP_heading': 180., 'data_adcp(1)': config_str}, index=idx)
+
+
+def row_by_row(df_all, tag_values):
+    frames = []
+    for name, cols, indexes in [
+            ('signature_100_configuration_munkholmen',
+             ['identifier', 'instrument_type_id', 'num_beams', 'num_cells', 'checksum'], [1, 2, 3, 4, 7]),
+            ('signature_100_depth_config_munkholmen', ['blanking', 'cell_size'], [5, 6])]:
+        df = pd.DataFrame(columns=cols)
+        for i in range(df_all.shape[0]):
+            d = df_all.iloc[i, -1]
+            df.loc[i, :] = [d.split(',')[j] for j in indexes]
+        df.index = df_all.index
+        frames.append((name, util_db.add_tags(df, tag_values)))
+    return frames
+
+
+def bench(name, func, df, repeats=3):
+    times = []
+    for _ in range(repeats):
+        t = time.perf_counter()
+        func(df, {'tag_sensor': 'signature_100', 'tag_unit': 'none'})
+        times.append(time.perf_counter() - t)
+    t = min(times)
+    print(f"{name:>30}: {df.shape[0] / t:12.0f} rows/s ({t:.3f} s)")
+
+
+def main():
+    for n_rows in [720, 5000]:
+        df = make_df(n_rows)
+        print(f'{n_rows} rows')
+        bench('row by row', row_by_row, df, repeats=1)
+        bench('vectorised split', loggernet._signature_100_config_munkholmen, df)
+
+
+if __name__ == "__main__":
+    main()
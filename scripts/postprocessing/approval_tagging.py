@@ -6,6 +6,7 @@ from influxdb import InfluxDBClient
 import config
 import util_db
 import util_file
+import util_cache
 
 # File to change the 'approval' tag of a measurement (table)
 # in influxdb.
@@ -56,6 +57,9 @@ def main():
             util_db.ingest_df(measurement, df, [client])
             print('Data written :)')
 
+        # The plots mustn't use the old tags from the query cache:
+        util_cache.invalidate(measurement, p[0], p[1])
+
         print("Finished all at "
               + datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
 
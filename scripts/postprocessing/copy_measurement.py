@@ -7,6 +7,7 @@ from ctd import CTD
 import config
 import util_db
 import util_file
+import util_cache
 
 '''
 Takes data from a measurement in one DB, and puts that into another.
@@ -33,21 +34,20 @@ def main():
     print("Starting running add_processed_data.py at "
           + datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
 
-    periods = util_db.break_down_time_period(start_time, end_time)
+    timeslice = f"time > '{start_time}' AND time < '{end_time}'"
+    tag_keys = util_db.get_tag_keys(read_client, measurement)
 
     # # ---- May need some custom code here:
     # # Get ctd object and load the calibration file.
     # ctd = CTD()
     # ctd.load_calibration()
 
-    for p in periods:
-        timeslice = f"time > '{p[0]}' AND time < '{p[1]}'"
-        print("Doing timeslice:", timeslice, end='')
+    # The data is streamed in chunks, so the time period can be as long as needed.
+    for df in util_db.iter_query_influxdb(read_client, measurement, timeslice):
+        print("Doing chunk starting at:", df['time'].iloc[0], end='')
 
-        # =================== Get the data:
-        df = util_db.query_influxdb(read_client, measurement, timeslice)
         # The result doesn't have 'tag_' on tag cols, and the index isn't time yet.
-        df = util_db.retag_tag_cols(df, util_db.get_tag_keys(read_client, measurement))
+        df = util_db.retag_tag_cols(df, tag_keys)
         # The below line should be checked, it might not be needed in your case.
         df = util_db.force_float_cols(df, not_float_cols=['time'], error_to_nan=True)  # Should be done after the above line
         df = df.set_index('time').tz_convert('UTC')  # Should be in correct TZ as comes from DB
@@ -56,6 +56,9 @@ def main():
         util_db.ingest_df(measurement, df, write_clients)
         print(f' ... {df.shape[0]} pts written :)')
 
+    # The plots mustn't use what the query cache had before the copy:
+    util_cache.invalidate(measurement, start_time, end_time)
+
     print("Finished all at "
           + datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
 
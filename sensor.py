@@ -1,16 +1,49 @@
 import os
 import logging
 import re
+import shlex
+import tempfile
+import subprocess
+from dataclasses import dataclass
 
 import util_file
+import util_ledger
 import config
 
 logger = logging.getLogger('olmo.sensor')
 
 
+@dataclass(frozen=True)
+class RemoteFile:
+    '''A file found on the remote machine, path is relative to Sensor.data_dir.'''
+    path: str
+    size: int
+    mtime: float
+
+
 class Sensor:
-    '''Base sensor class that non-loggernet sensors should inherit from.'''
+    '''
+    Base sensor class that non-loggernet sensors should inherit from.
+
+    The sensor holds one ssh connection to munkholmen (self.remote, opened on
+    first use), use it as a context manager so this is closed at the end:
+
+        with CTD(influx_clients=clients) as ctd:
+            ctd.rsync_and_ingest()
+
+    If use_file_ledger is set, the files processed are recorded in the file
+    ledger (see util_ledger.py) by mark_processed(), and rsync() only looks
+    for files that are not in it (nor returns files whose content has
+    already been processed). This is for sensors whose remote files are not
+    removed. The ingesters can also keep track of the last data ingested
+    from each file, see last_ingested_time().
+    '''
     def __init__(self):
+        self.remote = util_file.RemoteSession(
+            config.munkholmen_user, config.munkholmen_pc, port=config.munkholmen_ssh_port)
+        self.ledger = None
+        self.use_file_ledger = False
+        self._rsynced_remote_files = {}
         self.data_dir = None
         self.recursive_file_search_l0 = False
         self.recursive_file_search_l1 = False
@@ -37,14 +70,160 @@ class Sensor:
         self.measurement_name_l2 = None
         self.measurement_name_l3 = None
 
-    def fetch_files_list(self, file_regex, recursive_file_search, drop_recent_files):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        '''Closes the ssh connection to munkholmen (and the file ledger).'''
+        self.remote.close()
+        if self.ledger is not None:
+            self.ledger.close()
+            self.ledger = None
+
+    @property
+    def ledger_source(self):
+        '''Where the files come from, as recorded in the file ledger.'''
+        return f"{config.munkholmen_pc}:{self.data_dir}"
+
+    def mark_processed(self, files):
+        '''
+        Records the files (local paths, as returned by rsync()) as processed
+        in the file ledger. Does nothing if use_file_ledger isn't set.
+        '''
+        if self.ledger is None:
+            return
+        for f in files:
+            if f not in self._rsynced_remote_files:
+                logger.warning(f"File {f} wasn't rsync'ed in this run, not recording it in the file ledger.")
+                continue
+            level, remote_file, sha256 = self._rsynced_remote_files.pop(f)
+            self.ledger.record(self.ledger_source, level, remote_file, f, sha256)
+
+    def drop_processed_content(self, files):
+        '''
+        Removes from files (local paths, as returned by rsync()) those whose
+        content has already been processed (e.g. files that were touched but
+        haven't changed). They are recorded in the file ledger with their new
+        size and mtime, so that they aren't fetched again.
+
+        Returns
+        -------
+        list
+            The files whose content is new.
+        '''
+        if self.ledger is None:
+            return files
+        new_files = []
+        for f in files:
+            if f not in self._rsynced_remote_files:
+                new_files.append(f)
+                continue
+            level, remote_file, _ = self._rsynced_remote_files[f]
+            sha256 = util_ledger.file_hash(f)
+            if self.ledger.content_processed(self.ledger_source, sha256):
+                logger.info(f"The content of file {f} has already been processed, skipping it.")
+                self.ledger.record(self.ledger_source, level, remote_file, f, sha256)
+                del self._rsynced_remote_files[f]
+            else:
+                self._rsynced_remote_files[f] = (level, remote_file, sha256)
+                new_files.append(f)
+        return new_files
+
+    def last_ingested_time(self, name):
+        '''
+        Time of the last data ingested from the data file name (see
+        record_ingested_time()), None if there is no file ledger or nothing
+        has been ingested from it.
+
+        Returns
+        -------
+        float or None
+            Seconds since the epoch.
+        '''
+        if self.ledger is None:
+            return None
+        return self.ledger.last_time(self.ledger_source, name)
+
+    def record_ingested_time(self, name, last_time):
+        '''
+        Records the time (seconds since the epoch) of the last data ingested
+        from the data file name in the file ledger, so that when the file has grown
+        only the newer data is ingested. Does nothing if use_file_ledger
+        isn't set.
+        '''
+        if self.ledger is None:
+            return
+        self.ledger.record_last_time(self.ledger_source, name, last_time)
+
+    def fetch_manifest(self, searches, newer_than=None):
+        '''
+        Lists the files in the remote data_dir for several searches (e.g. the
+        file levels), using a single remote command.
+
+        Parameters
+        ----------
+        searches : dict
+            key : (file_regex, recursive_file_search), see fetch_files_list()
+        newer_than : dict
+            key : seconds since the epoch, only files modified after this
+            are listed for the search.
+
+        Returns
+        -------
+        dict
+            key : list of RemoteFile, sorted by path. For a non recursive
+            search this is all the (non hidden) files in data_dir, the
+            file_regex is applied in fetch_files_list().
+        '''
+
+        if self.data_dir is None:
+            raise ValueError("fetch_manifest() requires 'data_dir' is set.")
+        if not searches:
+            return {}
+
+        def newer(times):
+            if newer_than is None or any(newer_than.get(key) is None for key in times):
+                return ''
+            return f" -newermt @{min(newer_than[key] for key in times):.6f}"
+
+        data_dir = shlex.quote(self.data_dir)
+        commands = []
+        ls_keys = [key for key, (_, recursive) in searches.items() if not recursive]
+        if ls_keys:
+            commands.append(
+                f"find {data_dir} -mindepth 1 -maxdepth 1 -not -name '.*'{newer(ls_keys)}"
+                " -printf 'ls\\t%s\\t%T@\\t%P\\n'")
+        for i, (key, (file_regex, recursive)) in enumerate(searches.items()):
+            if recursive:
+                commands.append(
+                    f"find {data_dir} -name {shlex.quote(file_regex)}{newer([key])}"
+                    f" -printf '{i}\\t%s\\t%T@\\t%P\\n'")
+
+        out, err = self.remote.run('; '.join(commands))
+        if err:
+            logger.warning(f"Listing {self.data_dir} on {config.munkholmen_pc} gave: {err}")
+
+        found = {}
+        for line in out.splitlines():
+            tag, size, mtime, path = line.split('\t', 3)
+            found.setdefault(tag, []).append(RemoteFile(path, int(size), float(mtime)))
+
+        manifest = {}
+        for i, (key, (file_regex, recursive)) in enumerate(searches.items()):
+            manifest[key] = sorted(found.get(str(i) if recursive else 'ls', []), key=lambda f: f.path)
+        return manifest
+
+    def fetch_files_list(self, file_regex, recursive_file_search, drop_recent_files, manifest_files=None):
         '''Use regex to find all files up to self.drop_recent_files
 
         Will match all files from the remote data_dir using the file_regex
         pattern, and dropping the final (most recent) drop_recent_files files.
 
         Note that currently the most recent files are simpy those listed
-        last in the ls_string
+        last (sorted by name)
 
         Parameters
         ----------
@@ -53,6 +232,9 @@ class Sensor:
             If the file_regex is to be interpreted as the input to a linux 'find' query, not regex
         drop_recent_files : int
             Number of latest files to ignore.
+        manifest_files : list
+            The RemoteFiles of this search from fetch_manifest(), if None
+            they are fetched.
 
         Returns
         -------
@@ -62,31 +244,18 @@ class Sensor:
         if (self.data_dir is None) or (file_regex is None):
             raise ValueError("fetch_files_list() requires 'data_dir' and 'file_regex' are set.")
 
-        # TODO: Need to handle the ls_err (below in both statements) in some way.
+        if manifest_files is None:
+            manifest_files = self.fetch_manifest({'files': (file_regex, recursive_file_search)})['files']
+
         if recursive_file_search:
-            ls_out, ls_err = util_file.find_remote(
-                config.munkholmen_user, config.munkholmen_pc,
-                self.data_dir, file_regex, port=config.munkholmen_ssh_port)
-            # Using find_remote() it should already filter. Thus just split up string:
-            files = ls_out.split('\n')
-            if files[-1] == '':
-                files = files[:-1]
-            # Remove the 'self.data_dir' from the file path, so consistet with below
-            for i, f in enumerate(files):
-                files[i] = f[len(self.data_dir) + 1:]
-            files.sort()
+            # The find already filtered:
+            files = [f.path for f in manifest_files]
         else:
-            ls_out, ls_err = util_file.ls_remote(
-                config.munkholmen_user, config.munkholmen_pc,
-                self.data_dir, port=config.munkholmen_ssh_port)
             files = []
-            while True:
-                match = re.search(file_regex, ls_out)
-                if match is None:
-                    break
-                else:
+            for f in manifest_files:
+                match = re.search(file_regex, f.path)
+                if match is not None:
                     files.append(match.group())
-                    ls_out = ls_out[match.span()[1]:]
 
         if len(files) <= drop_recent_files:
             logger.info(f"No new files found matching regex pattern: {file_regex}")
@@ -99,6 +268,10 @@ class Sensor:
     def rsync(self):
         '''rsync's files from munkholmen to the controller PC.
 
+        The files of each level are transferred with one rsync (the files
+        are listed in a temporary file, see rsync --files-from), then
+        checked to have arrived (with the size and mtime of the remote file).
+
         Parameters
         ----------
         self.remove_remote_files : bool
@@ -107,7 +280,7 @@ class Sensor:
             If not None: maximum number of files to transfer
         '''
 
-        def rsync_file_level(files, remove_remote_files, max_files):
+        def rsync_file_level(level, files, remote_files, remove_remote_files, max_files):
 
             if files is None:
                 return
@@ -118,45 +291,95 @@ class Sensor:
                 else:
                     files = files[:max_files]
 
-            if remove_remote_files:
-                remove_flag = ' --remove-source-files'
-            else:
-                remove_flag = ''
+            # ---- One rsync for all the files, listed in a temporary file:
+            with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+                f.write('\n'.join(files) + '\n')
+                files_from = f.name
+            try:
+                command = ['rsync', '-a', f'--files-from={files_from}', '--no-relative',
+                           f'--rsh=ssh -p {config.munkholmen_ssh_port}']
+                if remove_remote_files:
+                    command.append('--remove-source-files')
+                command += [f"{config.munkholmen_user}@{config.munkholmen_pc}:{self.data_dir}/",
+                            config.rsync_inbox_adcp]
+                exit_code = subprocess.run(command).returncode
+            finally:
+                os.remove(files_from)
+            if exit_code != 0:
+                logger.error(f"Rsync exited with code {exit_code}, output sent to stdout, (probably the log from the cronjob).")
 
+            # ---- Check which files arrived (rsync -a keeps the size and mtime):
             rsynced_files = []
             for f in files:
-                rsync_path = f"{config.munkholmen_user}@{config.munkholmen_pc}:{os.path.join(self.data_dir, f)}"
-                exit_code = os.system(f'rsync -a{remove_flag} --rsh="ssh -p {config.munkholmen_ssh_port}" {rsync_path} {config.rsync_inbox_adcp}')
-                if exit_code != 0:
-                    logger.error(f"Rsync for file {f} didn't work, output sent to stdout, (probably the log from the cronjob).")
-                    return rsynced_files
+                local_file = os.path.join(config.rsync_inbox_adcp, os.path.basename(f))
+                remote_file = remote_files.get(f)
+                if os.path.isfile(local_file) and (remote_file is None or (
+                        os.path.getsize(local_file) == remote_file.size
+                        and int(os.path.getmtime(local_file)) == int(remote_file.mtime))):
+                    logger.info(f"rsync'ed file: {local_file}")
+                    rsynced_files.append(local_file)
+                    if remote_file is not None:
+                        self._rsynced_remote_files[local_file] = (level, remote_file, None)
                 else:
-                    logger.info(f"rsync'ed file: {os.path.join(config.rsync_inbox_adcp, os.path.basename(f))}")
-                    rsynced_files.append(os.path.join(config.rsync_inbox_adcp, os.path.basename(f)))
+                    logger.error(f"Rsync for file {f} didn't work.")
 
             return rsynced_files
 
-        def fetch_and_sync(file_regex, recursive_file_search, drop_recent_files, remove_remote_files, max_files):
-            files = self.fetch_files_list(file_regex, recursive_file_search, drop_recent_files)
-            files = rsync_file_level(files, remove_remote_files, max_files)
+        def fetch_and_sync(level, file_regex, recursive_file_search, drop_recent_files, remove_remote_files, max_files):
+            manifest_files = manifest[level]
+            if self.ledger is not None:
+                processed = self.ledger.processed(self.ledger_source, manifest_files)
+                manifest_files = [f for f in manifest_files if f.path not in processed]
+                logger.info(f"{len(processed)} files of {level} found in the file ledger, skipping them.")
+                # Until they are processed, the listing goes back to these files (see high_water_mark()):
+                self.ledger.set_pending(self.ledger_source, level, [
+                    f for f in manifest_files if recursive_file_search or re.search(file_regex, f.path)])
+            files = self.fetch_files_list(
+                file_regex, recursive_file_search, drop_recent_files, manifest_files=manifest_files)
+            remote_files = {remote_file.path: remote_file for remote_file in manifest_files}
+            files = rsync_file_level(level, files, remote_files, remove_remote_files, max_files)
+            if files is not None:
+                files = self.drop_processed_content(files)
             return files
 
+        searches = {
+            level: (file_search, recursive)
+            for level, file_search, recursive in [
+                ('l0', self.file_search_l0, self.recursive_file_search_l0),
+                ('l1', self.file_search_l1, self.recursive_file_search_l1),
+                ('l2', self.file_search_l2, self.recursive_file_search_l2),
+                ('l3', self.file_search_l3, self.recursive_file_search_l3)]
+            if isinstance(file_search, str)}
+
+        # ---- Only look for files newer than those already processed:
+        newer_than = None
+        if self.use_file_ledger:
+            if self.ledger is None:
+                self.ledger = util_ledger.FileLedger()
+            newer_than = {}
+            for level in searches:
+                mark = self.ledger.high_water_mark(self.ledger_source, level)
+                newer_than[level] = None if mark is None else mark - config.file_ledger_overlap.total_seconds()
+
+        # ---- List the files of all the levels in one go:
+        manifest = self.fetch_manifest(searches, newer_than)
+
         rsynced_files = {'l0': None, 'l1': None, 'l2': None, 'l3': None}
         if isinstance(self.file_search_l0, str):
             rsynced_files['l0'] = fetch_and_sync(
-                self.file_search_l0, self.recursive_file_search_l0, self.drop_recent_files_l0,
+                'l0', self.file_search_l0, self.recursive_file_search_l0, self.drop_recent_files_l0,
                 self.remove_remote_files_l0, self.max_files_l0)
         if isinstance(self.file_search_l1, str):
             rsynced_files['l1'] = fetch_and_sync(
-                self.file_search_l1, self.recursive_file_search_l1, self.drop_recent_files_l1,
+                'l1', self.file_search_l1, self.recursive_file_search_l1, self.drop_recent_files_l1,
                 self.remove_remote_files_l1, self.max_files_l1)
         if isinstance(self.file_search_l2, str):
             rsynced_files['l2'] = fetch_and_sync(
-                self.file_search_l2, self.recursive_file_search_l2, self.drop_recent_files_l2,
+                'l2', self.file_search_l2, self.recursive_file_search_l2, self.drop_recent_files_l2,
                 self.remove_remote_files_l2, self.max_files_l2)
         if isinstance(self.file_search_l3, str):
             rsynced_files['l3'] = fetch_and_sync(
-                self.file_search_l3, self.recursive_file_search_l3, self.drop_recent_files_l3,
+                'l3', self.file_search_l3, self.recursive_file_search_l3, self.drop_recent_files_l3,
                 self.remove_remote_files_l3, self.max_files_l3)
         return rsynced_files
 
@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import datetime
+import pandas as pd
+
+import config
+import util_db
+
+logger = logging.getLogger('olmo.util_cache')
+
+'''
+On disk cache of query results, used for queries that are repeated often
+over the same recent time range (e.g. the plots in generate_plots.py).
+
+Time is split into fixed windows (config.query_cache_window, aligned to
+the unix epoch). A window that ended more than config.query_cache_settle
+ago is taken to be complete, it is fetched and stored as a parquet file
+in config.query_cache_dir. Only the windows that are not complete yet
+(the tail of the query) are fetched from the database on every call.
+
+Data can still change after a window is cached (files ingested late,
+approval tags changed), so a cached window is fetched again once it is
+older than config.query_cache_ttl (the mtime of the file is the time it
+was fetched). Scripts that rewrite data should also call invalidate()
+for the measurement and time range.
+
+Windows fetched more than config.query_cache_max_age ago (i.e. not used
+since) are evicted, as are the oldest windows if the cache grows beyond
+config.query_cache_max_bytes.
+'''
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _key_dir(key, cache_dir):
+    '''Directory for the windows of one query, key[0] is used to make it readable.'''
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, re.sub(r'[^\w.-]', '_', str(key[0])) + '_' + digest)
+
+
+def _slice(df, start, end, time_col):
+    if df.empty:
+        return df
+    t = df.index if time_col is None else df[time_col]
+    return df[(t >= start) & (t < end)]
+
+
+def _window_file(key_dir, w):
+    return os.path.join(key_dir, w.strftime('%Y%m%dT%H%M%SZ') + '.parquet')
+
+
+def _fresh(path, ttl):
+    '''True if the window file exists and was fetched within ttl.'''
+    try:
+        return time.time() - os.path.getmtime(path) < ttl.total_seconds()
+    except FileNotFoundError:
+        return False
+
+
+def _write_window(path, df):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def cached_query(key, fetch, start_time, end_time, time_col='time', cache_dir=config.query_cache_dir,
+                 window=config.query_cache_window, settle=config.query_cache_settle, ttl=config.query_cache_ttl):
+    '''
+    Returns the data between start_time and end_time, taking complete time
+    windows from the cache, and only fetching the rest using fetch().
+
+    Parameters
+    ----------
+    key : tuple
+        Identifies the query (everything apart from the time range). The
+        first item is used in the name of the cache dir.
+    fetch : callable
+        fetch(start_time, end_time) must return a df of the data with
+        time >= start_time and time < end_time. Times are str of the
+        form: '2022-07-15T00:00:00Z'
+    start_time : str
+        Of the form: '2022-07-15T00:00:00Z'
+    end_time : str
+        Of the form: '2022-07-22T08:00:00Z'
+    time_col : str or None
+        Column of the df holding the times, if None the index is used.
+    cache_dir : str
+    window : datetime.timedelta
+        Length of the cached windows.
+    settle : datetime.timedelta
+        How long after a window ends it is taken to be complete.
+    ttl : datetime.timedelta
+        How long a cached window is used before it is fetched again.
+
+    Returns
+    -------
+    pd.DataFrame
+    '''
+
+    start = pd.Timestamp(datetime.datetime.strptime(start_time, TIME_FORMAT), tz='UTC')
+    end = pd.Timestamp(datetime.datetime.strptime(end_time, TIME_FORMAT), tz='UTC')
+    if end <= start:
+        raise ValueError("cached_query() requires end_time to be after start_time.")
+    freq = pd.Timedelta(window)
+    complete_before = pd.Timestamp.now(tz='UTC') - pd.Timedelta(settle)
+    key_dir = _key_dir(key, cache_dir)
+    os.makedirs(key_dir, exist_ok=True)
+
+    dfs = []
+    n_fetched = 0
+    w = start.floor(freq)
+    while w < end and w + freq <= complete_before:
+        path = _window_file(key_dir, w)
+        if _fresh(path, ttl):
+            df = pd.read_parquet(path)
+        else:
+            df = fetch(w.strftime(TIME_FORMAT), (w + freq).strftime(TIME_FORMAT))
+            _write_window(path, df)
+            n_fetched += 1
+        dfs.append(_slice(df, start, end, time_col))
+        w += freq
+    logger.debug(f"{key}: {len(dfs) - n_fetched} windows from the cache, {n_fetched} fetched and cached.")
+
+    if w < end:
+        dfs.append(fetch(max(w, start).strftime(TIME_FORMAT), end_time))
+
+    if n_fetched:
+        evict(cache_dir)
+
+    non_empty = [df for df in dfs if not df.empty]
+    if not non_empty:
+        return dfs[-1]
+    return pd.concat(non_empty, ignore_index=time_col is not None)
+
+
+def cached_query_influxdb(client, measurement, start_time, end_time, variable='*', downsample=False,
+                          approved='all'):
+    '''
+    util_db.query_influxdb() between start_time and end_time, using the
+    query cache (see cached_query()).
+
+    Parameters
+    ----------
+    client : influxdb.InfluxDBClient
+    measurement : str
+    start_time : str
+        Of the form: '2022-07-15T00:00:00Z'
+    end_time : str
+        Of the form: '2022-07-22T08:00:00Z'
+    variable : str or list
+        See util_db.query_influxdb()
+    downsample : bool or str
+        See util_db.query_influxdb()
+    approved : str
+        See util_db.query_influxdb()
+
+    Returns
+    -------
+    pd.DataFrame
+    '''
+
+    def fetch(start, end):
+        return util_db.query_influxdb(
+            client, measurement, f"time >= '{start}' AND time < '{end}'",
+            variable=variable, downsample=downsample, approved=approved)
+
+    key = (measurement, util_db.client_name(client), variable, downsample, approved)
+    return cached_query(key, fetch, start_time, end_time)
+
+
+def evict(cache_dir=config.query_cache_dir, max_age=config.query_cache_max_age,
+          max_bytes=config.query_cache_max_bytes):
+    '''
+    Removes the cached windows fetched more than max_age ago, then the
+    oldest ones until the cache is no bigger than max_bytes.
+
+    Returns
+    -------
+    int
+        Number of windows removed.
+    '''
+
+    files = []
+    for root, _, filenames in os.walk(cache_dir):
+        for f in filenames:
+            if not f.endswith('.parquet'):
+                continue
+            path = os.path.join(root, f)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    files.sort()
+
+    oldest_allowed = time.time() - max_age.total_seconds()
+    total_bytes = sum(f[1] for f in files)
+    n_removed = 0
+    for mtime, size, path in files:
+        if mtime >= oldest_allowed and total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+        n_removed += 1
+
+    if n_removed:
+        logger.info(f"Evicted {n_removed} windows from the query cache, {total_bytes} bytes left.")
+    return n_removed
+
+
+def invalidate(measurement, start_time, end_time, cache_dir=config.query_cache_dir,
+               window=config.query_cache_window):
+    '''
+    Removes the cached windows of all the queries of a measurement (key[0],
+    see cached_query()) that overlap start_time to end_time. To be called
+    after data of the measurement was changed or added in that range.
+
+    Parameters
+    ----------
+    measurement : str
+    start_time : str
+        Of the form: '2022-07-15T00:00:00Z'
+    end_time : str
+        Of the form: '2022-07-22T08:00:00Z'
+    cache_dir : str
+    window : datetime.timedelta
+        Length of the cached windows.
+
+    Returns
+    -------
+    int
+        Number of windows removed.
+    '''
+    if not os.path.isdir(cache_dir):
+        return 0
+    start = pd.Timestamp(datetime.datetime.strptime(start_time, TIME_FORMAT), tz='UTC')
+    end = pd.Timestamp(datetime.datetime.strptime(end_time, TIME_FORMAT), tz='UTC')
+    freq = pd.Timedelta(window)
+    key_dir_pattern = re.compile(re.escape(re.sub(r'[^\w.-]', '_', str(measurement))) + r'_[0-9a-f]{16}')
+
+    n_removed = 0
+    for d in os.listdir(cache_dir):
+        if not key_dir_pattern.fullmatch(d):
+            continue
+        key_dir = os.path.join(cache_dir, d)
+        w = start.floor(freq)
+        while w < end:
+            try:
+                os.remove(_window_file(key_dir, w))
+                n_removed += 1
+            except FileNotFoundError:
+                pass
+            w += freq
+
+    if n_removed:
+        logger.info(f"Invalidated {n_removed} windows of {measurement} in the query cache.")
+    return n_removed
@@ -1,13 +1,595 @@
+import os
+import fcntl
 import logging
 import datetime
+import queue
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
+from influxdb import InfluxDBClient
+from influxdb.exceptions import InfluxDBClientError
+
+import config
+import util_file
 
 logger = logging.getLogger('olmo.util_db')
 
+# Limits for a single write request. Influx rejects bodies over 25 MB by
+# default (max-body-size), stay well below that.
+BATCH_MAX_POINTS = 5000
+BATCH_MAX_BYTES = 5 * 1024 * 1024
+# Time (seconds) a single write to a client may take.
+WRITE_TIMEOUT = 120
+
+
+class InfluxWriteError(Exception):
+    '''
+    Raised when writing to one or more influx clients failed.
+    The 'errors' attribute is a dict of client name: exception.
+    '''
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f"{k}: {v!r}" for k, v in errors.items()))
+
+
+def _escape_key(string):
+    '''Escape a tag key, tag value or field key for line protocol.'''
+    return (string.replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=')
+            .replace(' ', '\\ ').replace('\n', '\\n'))
+
+
+def _encode_field_value(value):
+    '''
+    Line protocol representation of a single field value (or None if the
+    field should be left out). Mirrors what influxdb.line_protocol does for
+    the python types found in object columns.
+    '''
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int):
+        return str(value) + 'i'
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not np.isfinite(value):
+        return None
+    return repr(value)
+
+
+def _encode_field_col(col):
+    '''
+    Vectorised encoding of one field column. Returns an object array of
+    encoded values, with None where the field should be left out.
+
+    Numeric columns (int, bool and float dtypes) are all written as floats,
+    this is what the old dict based write_points() path did with numpy
+    types, so field types in the db do not change.
+    '''
+    if col.dtype.kind in 'fiub':
+        # Sensor data repeats a lot of values, so only format the unique ones.
+        codes, uniques = pd.factorize(col.to_numpy(dtype=np.float64))
+        encoded = np.array(list(map(repr, uniques.tolist())) + [None], dtype=object)
+        encoded[:-1][~np.isfinite(uniques)] = None
+        return encoded[codes]
+    codes, uniques = pd.factorize(col)
+    encoded = np.array([_encode_field_value(u) for u in uniques] + [None], dtype=object)
+    return encoded[codes]
+
+
+def _encode_tag_sets(df, tag_cols):
+    '''
+    Encode the tag set (',key=value,...') of each row of df. Returns an
+    object array of strings. Tags with an empty or missing value are left
+    out. Each distinct combination of tag values is only encoded once.
+    '''
+    if not tag_cols:
+        return np.full(df.shape[0], '', dtype=object)
+    codes = np.empty((df.shape[0], len(tag_cols)), dtype=np.int64)
+    encoded = []
+    for j, t in enumerate(tag_cols):
+        codes[:, j], uniques = pd.factorize(df[t])
+        encoded.append({i: _escape_key(str(u)) for i, u in enumerate(uniques)})
+    combos, inverse = np.unique(codes, axis=0, return_inverse=True)
+    keys = [_escape_key(t[4:]) for t in tag_cols]
+    tag_sets = []
+    for combo in combos:
+        tag_sets.append(''.join([f',{keys[j]}={encoded[j][c]}' for j, c in enumerate(combo) if encoded[j].get(c)]))
+    return np.array(tag_sets, dtype=object)[inverse.reshape(-1)]
+
 
-def ingest_df(measurement, df, clients):
+def df_to_line_protocol(measurement, df):
+    '''
+    Encode a df into influx line protocol in a columnar (vectorised) manner.
+
+    The df should have the same form as for ingest_df(). Tags are taken
+    from the 'tag_' columns, everything else is a field. Fields that are
+    NaN (or None) are left out of that point, points without any fields are
+    dropped. Timestamps are written in nanoseconds, a tz naive index is
+    assumed to be UTC.
+
+    Parameters
+    ----------
+    measurement : str
+    df : pd.DataFrame
+        See ingest_df()
+
+    Returns
+    -------
+    list
+        List of line protocol strings, one per point.
+    '''
+    if df.shape[0] == 0:
+        return []
+
+    tag_cols = sorted([c for c in df.columns if c[:4] == 'tag_'], key=lambda c: c[4:])
+    field_cols = [c for c in df.columns if c[:4] != 'tag_']
+    n_rows = df.shape[0]
+
+    # Measurement and tags:
+    measurement = measurement.replace('\\', '\\\\').replace(',', '\\,').replace(' ', '\\ ')
+    prefix = measurement + _encode_tag_sets(df, tag_cols)
+
+    # Fields, NaNs are simply missing from the point:
+    pieces = np.empty((n_rows, len(field_cols)), dtype=object)
+    for j, f in enumerate(field_cols):
+        vals = _encode_field_col(df[f])
+        present = ~pd.isna(vals)
+        vals[present] = _escape_key(f) + '=' + vals[present]
+        pieces[:, j] = vals
+    field_sets = np.array([','.join(filter(None, r)) for r in pieces.tolist()], dtype=object)
+
+    # Time, as ns since epoch:
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    times = index.values.astype('datetime64[ns]').astype(np.int64).astype(str).astype(object)
+
+    lines = prefix + ' ' + field_sets + ' ' + times
+    return lines[field_sets != ''].tolist()
+
+
+def iter_line_batches(measurement, df, max_points=BATCH_MAX_POINTS, max_bytes=BATCH_MAX_BYTES):
+    '''
+    Generator of line protocol batches for a df, bounded in both number of
+    points and size in bytes.
+
+    The df is encoded max_points rows at a time, so memory use depends on
+    the batch size and not on the size of df.
+
+    Parameters
+    ----------
+    measurement : str
+    df : pd.DataFrame
+        See ingest_df()
+    max_points : int
+        Max number of points (lines) in a batch.
+    max_bytes : int
+        Max size of a batch in bytes (as sent, i.e. utf-8 with newlines).
+        A single line larger than this is still sent, on its own.
+
+    Yields
+    ------
+    list
+        List of line protocol strings.
+    '''
+    for start in range(0, df.shape[0], max_points):
+        lines = df_to_line_protocol(measurement, df.iloc[start:start + max_points])
+        if not lines:
+            continue
+        ends = np.cumsum([len(line.encode('utf-8')) + 1 for line in lines])
+        i = 0
+        while i < len(lines):
+            offset = ends[i - 1] if i > 0 else 0
+            j = max(int(np.searchsorted(ends, offset + max_bytes, side='right')), i + 1)
+            yield lines[i:j]
+            i = j
+
+
+def get_influx_client(host, database, credentials_file=os.path.join(config.secrets_dir, 'influx_admin_credentials'),
+                      timeout=config.influx_timeout, retries=config.influx_retries, pool_size=config.influx_pool_size,
+                      gzip=True):
+    '''
+    Standard influxdb client for the ingestion scripts.
+
+    Requests (the line protocol writes) are gzip compressed, and the
+    connections are kept alive in a pool and reused for all requests of
+    the client. Failed connections are retried by the client itself.
+
+    Parameters
+    ----------
+    host : str
+    database : str
+    credentials_file : str
+        See util_file.get_user_pwd()
+    timeout : float
+        Timeout in seconds of each request.
+    retries : int
+        Number of attempts for a request, 0 is retry forever.
+    pool_size : int
+        Number of connections kept alive.
+    gzip : bool
+
+    Returns
+    -------
+    influxdb.InfluxDBClient
+    '''
+    user, pwd = util_file.get_user_pwd(credentials_file)
+    return InfluxDBClient(
+        host, config.influx_port, user, pwd, database,
+        timeout=timeout, retries=retries, pool_size=pool_size, gzip=gzip)
+
+
+def client_name(client):
+    '''
+    Name of an influxdb.InfluxDBClient (url and database), for logging.
+
+    Parameters
+    ----------
+    client : influxdb.InfluxDBClient
+
+    Returns
+    -------
+    str
+    '''
+    return f"{getattr(client, '_baseurl', client)}/{getattr(client, '_database', '')}"
+
+
+def _client_spool_dir(client, spool_dir):
+    '''Directory of the spool for one client (target).'''
+    return os.path.join(spool_dir, re.sub('[^A-Za-z0-9_.-]+', '_', client_name(client)))
+
+
+class _SpoolLock:
+    '''
+    Exclusive lock on a client's spool directory, held while appending to
+    or cleaning up the spool file. Several cron jobs write to the same
+    servers, so this has to be a lock between processes.
+
+    With blocking=False, acquire() returns False (and entering raises
+    BlockingIOError) if the lock is held by another process.
+    '''
+    def __init__(self, directory, name='.lock', blocking=True):
+        self.path = os.path.join(directory, name)
+        self.blocking = blocking
+
+    def acquire(self):
+        '''Takes the lock, returns False if blocking=False and it is held by another process.'''
+        self.f = open(self.path, 'a')
+        try:
+            fcntl.flock(self.f, fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.f.close()
+            return False
+        except OSError:
+            self.f.close()
+            raise
+        return True
+
+    def release(self):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise BlockingIOError(f"{self.path} is held by another process.")
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def spool_lines(client, lines, spool_dir=config.influx_spool_dir):
+    '''
+    Append line protocol to the (on disk) spool of a client.
+    The data is flushed to disk before returning. The spool is written to
+    the client on a later run by replay_spool().
+
+    Parameters
+    ----------
+    client : influxdb.InfluxDBClient
+    lines : list
+        List of line protocol strings.
+    spool_dir : str
+    '''
+    directory = _client_spool_dir(client, spool_dir)
+    os.makedirs(directory, exist_ok=True)
+    with _SpoolLock(directory):
+        with open(os.path.join(directory, 'spool.lp'), 'ab') as f:
+            f.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _rejected(error):
+    '''
+    True if a write failed because the server rejected the data itself
+    (4xx, e.g. a field type conflict), so writing it again can't work.
+    Authentication errors (401, 403) and a missing database (404) are
+    not, they can be fixed on the server.
+    '''
+    code = getattr(error, 'code', None)
+    return isinstance(error, InfluxDBClientError) and isinstance(code, int) \
+        and 400 <= code < 500 and code not in (401, 403, 404)
+
+
+def _replay_client_spool(client, directory, max_points, max_bytes):
+    '''
+    Write the spool of one client, see replay_spool(). The caller holds the
+    replay lock of the spool directory.
+
+    Returns
+    -------
+    int
+        Number of points replayed.
+    '''
+    name = client_name(client)
+    spool_file = os.path.join(directory, 'spool.lp')
+    cursor_file = os.path.join(directory, 'cursor')
+    rejected_file = os.path.join(directory, 'rejected.lp')
+    if not os.path.isfile(spool_file):
+        return 0
+
+    def set_cursor(position):
+        with open(cursor_file + '.tmp', 'w') as f:
+            f.write(str(position))
+        os.replace(cursor_file + '.tmp', cursor_file)
+
+    cursor = 0
+    n_points = 0
+    n_rejected = 0
+    try:
+        if os.path.isfile(cursor_file):
+            with open(cursor_file, 'r') as f:
+                cursor = int(f.read() or 0)
+        # spool_lines() may be appending, only read what was written before now:
+        with _SpoolLock(directory):
+            end = os.path.getsize(spool_file)
+        with open(spool_file, 'rb') as f:
+            f.seek(cursor)
+            position = cursor
+            while True:
+                batch, n_bytes = [], 0
+                while len(batch) < max_points and n_bytes < max_bytes and position < end:
+                    line = f.readline(end - position)
+                    if not line.endswith(b'\n'):
+                        # A line not written in full, left for the next run.
+                        f.seek(position)
+                        break
+                    position += len(line)
+                    n_bytes += len(line)
+                    if line.strip():
+                        batch.append(line.decode('utf-8').rstrip('\n'))
+                if not batch:
+                    cursor = position
+                    break
+                try:
+                    client.write_points(batch, protocol='line')
+                    n_points += len(batch)
+                except Exception as error:
+                    if not _rejected(error):
+                        raise
+                    # Retrying can't help, keep the batch aside (to be looked at) and carry on:
+                    logger.error(f"{name} rejected a spooled batch of {len(batch)} points, "
+                                 f"moved to {rejected_file}: {error!r}")
+                    with open(rejected_file, 'ab') as r:
+                        r.write(('\n'.join(batch) + '\n').encode('utf-8'))
+                        r.flush()
+                        os.fsync(r.fileno())
+                    n_rejected += len(batch)
+                cursor = position
+                set_cursor(cursor)
+    except Exception as error:
+        logger.error(f"Replaying spool to {name} failed after {n_points} points, will try again next run: {error!r}")
+    else:
+        try:
+            with _SpoolLock(directory):
+                # Only remove if nothing was appended while replaying.
+                if os.path.getsize(spool_file) == cursor:
+                    os.remove(spool_file)
+                    if os.path.isfile(cursor_file):
+                        os.remove(cursor_file)
+        except OSError as error:
+            logger.warning(f"Cleaning up the spool of {name} failed, will be done next run: {error!r}")
+    if n_points:
+        logger.info(f"Replayed {n_points} spooled points to {name}.")
+    if n_rejected:
+        logger.error(f"{n_rejected} spooled points rejected by {name}, see {rejected_file}.")
+    return n_points
+
+
+def replay_spool(clients, spool_dir=config.influx_spool_dir, max_points=BATCH_MAX_POINTS,
+                 max_bytes=BATCH_MAX_BYTES):
+    '''
+    Write the spooled data (see spool_lines()) of each client to that
+    client, in bulk batches.
+
+    Each client has its own cursor (byte offset into its spool file) that
+    is moved forward after every successful batch, so each client catches
+    up on its own and a failed replay continues where it stopped next time.
+    Once a client is fully caught up its spool file is removed.
+
+    Only one process replays a spool at a time (a replay lock per spool
+    directory), a client whose spool is being replayed by another process
+    is skipped. Batches the server rejects (4xx, see _rejected()) are moved
+    to rejected.lp in the spool directory, so they don't block the rest.
+
+    Parameters
+    ----------
+    clients : list
+        List of influxdb.InfluxDBClient
+    spool_dir : str
+    max_points : int
+        Max number of points in a single write request.
+    max_bytes : int
+        Max size in bytes of a single write request.
+
+    Returns
+    -------
+    dict
+        client name: number of points replayed
+    '''
+    replayed = {}
+    for c in clients:
+        name = client_name(c)
+        directory = _client_spool_dir(c, spool_dir)
+        if not os.path.isfile(os.path.join(directory, 'spool.lp')):
+            continue
+        lock = _SpoolLock(directory, name='.replay_lock', blocking=False)
+        if not lock.acquire():
+            logger.info(f"The spool of {name} is being replayed by another process, skipping it.")
+            continue
+        try:
+            replayed[name] = _replay_client_spool(c, directory, max_points, max_bytes)
+        finally:
+            lock.release()
+    return replayed
+
+
+class _ClientWriter(threading.Thread):
+    '''
+    Writes batches of line protocol to a single client, in its own thread.
+    Batches are handed over through an (unbounded) queue, so putting a
+    batch never waits and one slow client doesn't hold back the others.
+    The batches are those of one ingest, which are in memory anyway.
+
+    The first failed write, or a single write not finishing within the
+    timeout, is kept in self.error and no more writes are attempted to
+    that client. From then on the batches (including the one that failed)
+    are put in the spool for that client, if spool_dir is given.
+    '''
+    def __init__(self, client, timeout, spool_dir=None):
+        super(_ClientWriter, self).__init__(daemon=True)
+        self.client = client
+        self.name = client_name(client)
+        self.queue = queue.Queue()
+        self.timeout = timeout
+        self.spool_dir = spool_dir
+        self.spool_lock = threading.Lock()
+        self.error = None
+        self.given_up = False
+        self.current = None
+        self.write_started = None
+        self.n_points = 0
+        self.n_spooled = 0
+
+    def _spool(self, batch):
+        if self.spool_dir is None:
+            return
+        with self.spool_lock:
+            spool_lines(self.client, batch, self.spool_dir)
+            self.n_spooled += len(batch)
+
+    def run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                self._spool(batch)
+                continue
+            self.current = batch
+            self.write_started = time.monotonic()
+            try:
+                self.client.write_points(batch, protocol='line')
+                self.n_points += len(batch)
+            except Exception as error:
+                if self.error is None:
+                    self.error = error
+                self._spool(batch)
+            self.write_started = None
+            self.current = None
+
+    def _write_overdue(self):
+        '''True if the write in progress has taken longer than the timeout.'''
+        started = self.write_started
+        return started is not None and time.monotonic() - started > self.timeout
+
+    def _give_up(self):
+        '''
+        Called when a write hangs: spool what this writer still holds (the
+        batch being written may still go through, writing it twice is
+        harmless) and stop the thread once that write returns.
+        '''
+        if self.error is None:
+            self.error = TimeoutError(f"A write to {self.name} didn't finish within {self.timeout} s.")
+        self.given_up = True
+        current = self.current
+        if current is not None:
+            self._spool(current)
+        while True:
+            try:
+                batch = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is not None:
+                self._spool(batch)
+        self.queue.put_nowait(None)
+
+    def put(self, batch):
+        '''Queue a batch for writing, or spool it if this writer has failed.'''
+        if self.error is None and self._write_overdue():
+            self._give_up()
+        if self.error is None:
+            self.queue.put_nowait(batch)
+            return
+        self._spool(batch)
+
+    def finish(self):
+        '''Wait for all queued batches to be written (or spooled).'''
+        if self.given_up:
+            return
+        self.queue.put_nowait(None)
+        while self.is_alive():
+            if self._write_overdue():
+                self._give_up()
+                return
+            self.join(timeout=min(1.0, self.timeout))
+
+
+def iter_frames_batches(frames, max_points=BATCH_MAX_POINTS, max_bytes=BATCH_MAX_BYTES):
+    '''
+    Generator of line protocol batches for several dfs, each of its own
+    measurement. Points of different measurements go into the same batch,
+    with the same bounds as iter_line_batches().
+
+    Parameters
+    ----------
+    frames : list
+        List of (measurement, df) touples, see ingest_df() for the form of df.
+    max_points : int
+    max_bytes : int
+        See iter_line_batches()
+
+    Yields
+    ------
+    list
+        List of line protocol strings.
+    '''
+    batch = []
+    n_bytes = 0
+    for measurement, df in frames:
+        for lines in iter_line_batches(measurement, df, max_points=max_points, max_bytes=max_bytes):
+            size = sum(len(line.encode('utf-8')) + 1 for line in lines)
+            if batch and (len(batch) + len(lines) > max_points or n_bytes + size > max_bytes):
+                yield batch
+                batch = []
+                n_bytes = 0
+            batch.extend(lines)
+            n_bytes += size
+    if batch:
+        yield batch
+
+
+def ingest_df(measurement, df, clients, max_points=BATCH_MAX_POINTS, max_bytes=BATCH_MAX_BYTES,
+              timeout=WRITE_TIMEOUT, spool_dir=config.influx_spool_dir):
     '''
     Ingest a df to a list of influxdb clients.
     df must have a specific form:
@@ -17,28 +599,91 @@ def ingest_df(measurement, df, clients):
            uplaod.
         3. field value cols are simple those WITHOUT 'tag_'.
 
+    See ingest_dfs() for how the df is written, and the parameters.
+
+    Returns
+    -------
+    int
+        Number of points encoded (written or spooled for each client).
+    '''
+    return ingest_dfs(
+        [(measurement, df)], clients, max_points=max_points, max_bytes=max_bytes,
+        timeout=timeout, spool_dir=spool_dir)
+
+
+def ingest_dfs(frames, clients, max_points=BATCH_MAX_POINTS, max_bytes=BATCH_MAX_BYTES,
+               timeout=WRITE_TIMEOUT, spool_dir=config.influx_spool_dir):
+    '''
+    Ingest several dfs, each of its own measurement, to a list of influxdb
+    clients. Typically all the measurements made from one file, so that
+    they are sent together: for a file that fits in one batch that is a
+    single write request per client.
+
+    The dfs are encoded to line protocol (see df_to_line_protocol()) in
+    batches that mix the measurements (see iter_frames_batches()). The
+    batches are written to all the clients in parallel, one thread per
+    client, so a slow client doesn't hold back the others.
+
+    If writing to a client fails (or times out) the other clients still
+    get all the data. The data that didn't reach the failed client is put
+    in its spool on disk (see spool_lines()), to be written on a later run
+    by replay_spool(). If spool_dir is None InfluxWriteError is raised
+    instead.
+
     Parameters
     ----------
-    measurement : str
-    df : pd.DataFrame
-        See above for clarification
+    frames : list
+        List of (measurement, df) touples, see ingest_df() for the form of df.
     clients : list
         Should be a list of influxdb.InfluxDBClient
+    max_points : int
+        Max number of points in a single write request.
+    max_bytes : int
+        Max size in bytes of a single write request.
+    timeout : float
+        Time in seconds a single write request may take, for each client
+        separately. A client that doesn't finish a write in this time is
+        treated as failed.
+    spool_dir : str or None
+        Directory of the write spool.
+
+    Returns
+    -------
+    int
+        Number of points encoded (written or spooled for each client).
     '''
-    tag_cols = [c for c in df.columns if c[:4] == 'tag_']
-    field_cols = [c for c in df.columns if c not in tag_cols]
+    if len(frames) == 1:
+        name = frames[0][0]
+    else:
+        name = f"{len(frames)} measurements"
+    n_rows = sum(df.shape[0] for _, df in frames)
 
-    data = []
-    for index, row in df.iterrows():
-        data.append({
-            'measurement': measurement,
-            'time': index,
-            'tags': {t[4:]: row[t] for t in tag_cols},
-            'fields': {f: row[f] for f in field_cols},
-        })
+    writers = [_ClientWriter(c, timeout, spool_dir=spool_dir) for c in clients]
+    for w in writers:
+        w.start()
 
-    for c in clients:
-        c.write_points(data)
+    n_points = 0
+    for i, batch in enumerate(iter_frames_batches(frames, max_points=max_points, max_bytes=max_bytes)):
+        if spool_dir is None and all([w.error is not None for w in writers]):
+            break
+        for w in writers:
+            w.put(batch)
+        n_points += len(batch)
+        logger.debug(f"{name}: batch {i + 1} queued, {len(batch)} points ({n_points} of {n_rows} rows).")
+
+    errors = {}
+    for w in writers:
+        w.finish()
+        if w.error is not None:
+            logger.error(f"Writing {name} to {w.name} failed after {w.n_points} points, "
+                         f"{w.n_spooled} points spooled: {w.error!r}")
+            errors[w.name] = w.error
+
+    if errors and spool_dir is None:
+        raise InfluxWriteError(errors)
+    if n_points == 0:
+        logger.info(f"No points to write to {name}.")
+    return n_points
 
 
 def force_float_cols(df, float_cols=None, not_float_cols=None, error_to_nan=False):
@@ -159,6 +804,69 @@ def filter_and_tag_df(df_all, field_keys, tag_values, disapprove_nans=False):
     return df
 
 
+def result_to_df(result, columns=None):
+    '''
+    Builds a df directly from the raw response of an influx query.
+
+    Each series (table) of the response is turned into a df in one go from
+    its columns/values, series from a GROUP BY on tags get those tags as
+    columns, and all the series are concatenated. The query should be made
+    with epoch='ns' so times are integers, these are converted in one
+    vectorised step.
+
+    Parameters
+    ----------
+    result : influxdb.resultset.ResultSet
+    columns : list or None
+        Columns of the (empty) df returned if there are no results.
+
+    Returns
+    -------
+    pd.DataFrame
+        With a 'time' column (in CET).
+    '''
+    dfs = []
+    for series in result.raw.get('series', []):
+        df = pd.DataFrame(series['values'], columns=series['columns'])
+        for k, v in series.get('tags', {}).items():
+            df[k] = v
+        dfs.append(df)
+    if dfs:
+        df = pd.concat(dfs, ignore_index=True) if len(dfs) > 1 else dfs[0]
+    else:
+        df = pd.DataFrame(columns=columns if columns is not None else ['time'])
+    df['time'] = pd.to_datetime(df['time'], unit='ns', utc=True).dt.tz_convert('CET')
+    return df
+
+
+def _build_query(measurement, timeslice, variable='*', downsample=False, approved='all'):
+    '''
+    Builds the InfluxQL query used by query_influxdb() and
+    iter_query_influxdb(). Returns the query and the expected columns.
+    '''
+    if approved == 'all':
+        approved_text = ''
+    else:
+        approved_text = f'''AND "approved" = '{approved}' '''
+
+    if variable == '*':
+        variable_text = '*'
+        columns = ['time']
+    elif isinstance(variable, list):
+        variable_text = ", ".join([f'"{v}"' for v in variable])
+        columns = ['time'] + variable
+    else:
+        variable_text = f'"{variable}"'
+        columns = ['time', variable]
+
+    if downsample:
+        q = f'''SELECT mean({variable_text}) AS "{variable}" FROM "{measurement}" WHERE {timeslice} {approved_text}GROUP BY {downsample}'''
+    else:
+        q = f'''SELECT {variable_text} FROM "{measurement}" WHERE {timeslice} {approved_text}'''
+
+    return q, columns
+
+
 def query_influxdb(client, measurement, timeslice, variable='*', downsample=False, approved='all'):
     '''
     Querires influxDB measurement within some particular timeslice.
@@ -187,43 +895,66 @@ def query_influxdb(client, measurement, timeslice, variable='*', downsample=Fals
     Returns
     -------
     pd.DataFrame
+        With a 'time' column (in CET), and a column per field (and tag).
     '''
 
-    if approved == 'all':
-        approved_text = ''
-    else:
-        approved_text = f'''AND "approved" = '{approved}' '''
+    q, columns = _build_query(measurement, timeslice, variable=variable, downsample=downsample, approved=approved)
+    result = client.query(q, epoch='ns')
+    return result_to_df(result, columns=columns)
 
-    if variable == '*':
-        variable_text = '*'
-        df = pd.DataFrame(columns=['time'])
-    elif isinstance(variable, list):
-        variable_text = ", ".join(variable)
-        df = pd.DataFrame(columns=variable.insert(0, 'time'))
-    else:
-        variable_text = f'"{variable}"'
-        df = pd.DataFrame(columns=['time', variable])
 
-    if downsample:
-        q = f'''SELECT mean({variable_text}) AS "{variable}" FROM "{measurement}" WHERE {timeslice} {approved_text}GROUP BY {downsample}'''
-    else:
-        q = f'''SELECT {variable_text} FROM "{measurement}" WHERE {timeslice} {approved_text}'''
+def iter_query_influxdb(client, measurement, timeslice, variable='*', approved='all', chunk_size=50000):
+    '''
+    Generator version of query_influxdb(), yields the result as a sequence
+    of dfs of at most chunk_size rows, in time order.
 
-    result = client.query(q)
-    for table in result:
-        # Not sure this works if there are multiple tables.
-        col_names = [k for k in table[0].keys()]
-        col_vals = [[] for _ in col_names]
-        for pt in table:
-            for i, v in enumerate(pt.values()):
-                col_vals[i].append(v)
-        df = pd.DataFrame.from_dict({col_names[i]: col_vals[i] for i in range(len(col_names))})
-    try:
-        df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%dT%H:%M:%SZ')
-    except ValueError:
-        df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%dT%H:%M:%S.%fZ')
-    df['time'] = df['time'].dt.tz_localize('UTC').dt.tz_convert('CET')
-    return df
+    Each chunk is its own query (ORDER BY time LIMIT chunk_size) starting
+    from the time of the last row of the previous chunk, so only one chunk
+    is held in memory at a time, whatever the length of timeslice.
+
+    Parameters
+    ----------
+    client : influxdb.InfluxDBClient
+    measurement : str
+    timeslice : str
+        See query_influxdb()
+    variable : str or list
+        See query_influxdb()
+    approved : str
+        See query_influxdb()
+    chunk_size : int
+        Max number of rows per chunk.
+
+    Yields
+    ------
+    pd.DataFrame
+        Same form as the output of query_influxdb()
+    '''
+    cursor = None
+    # Number of rows already returned with time == cursor, several series
+    # (tag sets) can have points at the same time.
+    n_at_cursor = 0
+    while True:
+        if cursor is None:
+            q, columns = _build_query(measurement, timeslice, variable=variable, approved=approved)
+            q = f"{q}ORDER BY time ASC LIMIT {chunk_size}"
+        else:
+            q, columns = _build_query(
+                measurement, f"({timeslice}) AND time >= {cursor}", variable=variable, approved=approved)
+            q = f"{q}ORDER BY time ASC LIMIT {chunk_size} OFFSET {n_at_cursor}"
+        result = client.query(q, epoch='ns')
+        df = result_to_df(result, columns=columns)
+        if df.shape[0] == 0:
+            return
+        yield df
+
+        if df.shape[0] < chunk_size:
+            return
+        times = df['time'].values.astype('datetime64[ns]').astype(np.int64)
+        last = int(times[-1])
+        n_last = int((times == last).sum())
+        n_at_cursor = n_at_cursor + n_last if last == cursor else n_last
+        cursor = last
 
 
 def get_field_keys(client, measurement):
@@ -277,10 +1008,10 @@ def get_tag_keys(client, measurement):
     return tag_keys
 
 
-def break_down_time_period(start_time, end_time):
+def break_down_time_period(start_time, end_time, period=datetime.timedelta(days=1)):
     '''
-    Breaks a time slice down into a list of time periods no longer than 1 day
-    TODO: Eventually could add option to specify the length of the sub periods.
+    Breaks a time slice down into a list of time periods no longer than
+    'period' (default 1 day).
 
     Parameters
     ----------
@@ -288,6 +1019,8 @@ def break_down_time_period(start_time, end_time):
         Of the form: '2022-07-15T00:00:00Z'
     end_time : str
         Of the form: '2022-07-22T08:00:00Z'
+    period : datetime.timedelta
+        Length of the sub periods, the last one may be shorter.
 
     Returns
     -------
@@ -298,24 +1031,66 @@ def break_down_time_period(start_time, end_time):
 
     start_time_ = datetime.datetime.strptime(start_time, '%Y-%m-%dT%H:%M:%SZ')
     end_time_ = datetime.datetime.strptime(end_time, '%Y-%m-%dT%H:%M:%SZ')
-    total_time_delta = end_time_ - start_time_
     periods = []
 
-    # Assuming breaking down into days:
-    d = 0
-    while d < total_time_delta.days:
-        periods.append((
-            (start_time_ + datetime.timedelta(days=d)).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            (start_time_ + datetime.timedelta(days=d + 1)).strftime('%Y-%m-%dT%H:%M:%SZ')))
-        d += 1
-    if total_time_delta.seconds > 0:
+    t = start_time_
+    while t < end_time_:
         periods.append((
-            (start_time_ + datetime.timedelta(days=d)).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            end_time_.strftime('%Y-%m-%dT%H:%M:%SZ')))
+            t.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            min(t + period, end_time_).strftime('%Y-%m-%dT%H:%M:%SZ')))
+        t += period
 
     return periods
 
 
+def parallel_query_influxdb(client, measurement, start_time, end_time, period=datetime.timedelta(days=1),
+                            max_workers=4, variable='*', downsample=False, approved='all'):
+    '''
+    Runs query_influxdb() over a long time range as a set of shorter time
+    slices (see break_down_time_period()), with the slice queries run
+    concurrently, and returns the results as one df in time order.
+
+    Each slice is 'time >= start AND time < stop', so slices don't overlap.
+
+    Parameters
+    ----------
+    client : influxdb.InfluxDBClient
+    measurement : str
+    start_time : str
+        Of the form: '2022-07-15T00:00:00Z'
+    end_time : str
+        Of the form: '2022-07-22T08:00:00Z'
+    period : datetime.timedelta
+        Length of the time slices.
+    max_workers : int
+        Number of queries run at the same time. Note the client keeps at
+        most config.influx_pool_size connections open.
+    variable : str or list
+        See query_influxdb()
+    downsample : bool or str
+        See query_influxdb()
+    approved : str
+        See query_influxdb()
+
+    Returns
+    -------
+    pd.DataFrame
+        Same form as the output of query_influxdb()
+    '''
+    def query_period(p):
+        timeslice = f"time >= '{p[0]}' AND time < '{p[1]}'"
+        return query_influxdb(client, measurement, timeslice, variable=variable, downsample=downsample, approved=approved)
+
+    periods = break_down_time_period(start_time, end_time, period=period)
+    if not periods:
+        raise ValueError("parallel_query_influxdb() requires end_time to be after start_time.")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map() returns the results in the order of periods.
+        dfs = list(executor.map(query_period, periods))
+    return pd.concat(dfs, ignore_index=True)
+
+
 def format_str(string):
     '''
     Formats a string such that it conforms to Williams conventions for
@@ -87,15 +87,9 @@ def ls_remote(user, machine, directory, port=22):
     -------
     str
     '''
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(machine, username=user, port=port)
-
     command = f"ls {directory}"
-    stdin, stdout, stderr = ssh.exec_command(command)
-    stdout = stdout.read().decode(errors='ignore'), stderr.read().decode(errors='ignore')
-
-    return stdout
+    with RemoteSession(user, machine, port=port) as session:
+        return session.run(command)
 
 
 def find_remote(user, machine, directory, search, port=22):
@@ -116,15 +110,109 @@ def find_remote(user, machine, directory, search, port=22):
     -------
     str
     '''
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    ssh.connect(machine, username=user, port=port)
-
     command = f"find {directory} -name '{search}'"
-    stdin, stdout, stderr = ssh.exec_command(command)
-    stdout = stdout.read().decode(errors='ignore'), stderr.read().decode(errors='ignore')
+    with RemoteSession(user, machine, port=port) as session:
+        return session.run(command)
+
+
+class RemoteSession:
+    '''
+    A single ssh connection to a remote machine, used for all the commands
+    and file transfers to/from it (they are run over channels of the same
+    connection). Connects on first use, and reconnects if the connection
+    has dropped.
+
+    Use as a context manager, or call close() when done:
+
+        with util_file.RemoteSession(user, machine) as session:
+            stdout, stderr = session.run('dir')
+            session.get(remote_path, local_path)
+
+    Parameters
+    ----------
+    user : str
+    machine : str
+        IP address of the maching you will connect to.
+    port : int, default 22
+    timeout : float, default 240
+        Seconds, for connecting and for each command/transfer to not make
+        progress.
+    '''
 
-    return stdout
+    def __init__(self, user, machine, port=22, timeout=240):
+        self.user = user
+        self.machine = machine
+        self.port = port
+        self.timeout = timeout
+        self._ssh = None
+        self._sftp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _client(self):
+        transport = self._ssh.get_transport() if self._ssh is not None else None
+        if transport is None or not transport.is_active():
+            self.close()
+            logger.info(f"Opening ssh connection to {self.user}@{self.machine}:{self.port}.")
+            self._ssh = paramiko.SSHClient()
+            self._ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            self._ssh.connect(self.machine, username=self.user, port=self.port, timeout=self.timeout)
+        return self._ssh
+
+    def _sftp_client(self):
+        ssh = self._client()
+        if self._sftp is None or self._sftp.get_channel().closed:
+            self._sftp = ssh.open_sftp()
+            self._sftp.get_channel().settimeout(self.timeout)
+        return self._sftp
+
+    def run(self, command):
+        '''
+        Runs command on the remote machine.
+
+        Returns
+        -------
+        str, str
+            stdout, stderr
+        '''
+        stdin, stdout, stderr = self._client().exec_command(command, timeout=self.timeout)
+        return stdout.read().decode(errors='ignore'), stderr.read().decode(errors='ignore')
+
+    def listdir_attr(self, path):
+        '''
+        Lists the directory path over sftp.
+
+        Returns
+        -------
+        list
+            Of paramiko.SFTPAttributes, with filename, st_size and st_mtime.
+        '''
+        return self._sftp_client().listdir_attr(path)
+
+    def get(self, remote_path, local_path):
+        '''
+        Copies remote_path to local_path over sftp. The file is written to a
+        temporary file first, so local_path only exists once it is complete.
+        '''
+        tmp_path = local_path + '.part'
+        try:
+            self._sftp_client().get(remote_path, tmp_path)
+            os.replace(tmp_path, local_path)
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def close(self):
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
+        if self._ssh is not None:
+            self._ssh.close()
+            self._ssh = None
 
 
 def get_user_pwd(file):
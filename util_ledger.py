@@ -0,0 +1,189 @@
+import os
+import hashlib
+import logging
+import sqlite3
+import datetime
+
+import config
+
+logger = logging.getLogger('olmo.util_ledger')
+
+'''
+Local ledger (an sqlite db) of the remote files that have been processed,
+so that they are not fetched and ingested again when the remote files are
+not removed (e.g. the gas analyser files).
+
+Files are recorded per source (the remote machine and directory) with their
+path (relative to the source directory), size, mtime and the sha256 of
+the copy that was processed. A file is taken to be processed if the path,
+size and mtime all match the ledger, so a file that has since grown is
+processed again. A file whose content (sha256) has already been processed,
+e.g. one that was only touched, needn't be processed again either.
+
+Files that were listed but not processed (yet) are kept as pending, the
+listing of the next run goes back to the oldest of them (see
+high_water_mark()), so a file that failed isn't lost.
+
+For files that grow, the ledger also keeps the time of the last data
+ingested from each data file (by name), so only the newer rows are
+ingested when the file is processed again.
+'''
+
+
+def file_hash(file_path, chunk_size=1024 * 1024):
+    '''sha256 of the file (hex).'''
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class FileLedger:
+    '''
+    Parameters
+    ----------
+    db_file : str
+        The sqlite db, created if it doesn't exist.
+    '''
+
+    def __init__(self, db_file=config.file_ledger):
+        self.db_file = db_file
+        self._db = sqlite3.connect(db_file)
+        with self._db:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    source TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    sha256 TEXT,
+                    processed_at TEXT NOT NULL,
+                    PRIMARY KEY (source, path))''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS files_mtime ON files (source, level, mtime)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS files_sha256 ON files (source, sha256)')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS pending (
+                    source TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    PRIMARY KEY (source, path))''')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS data_times (
+                    source TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    last_time REAL NOT NULL,
+                    PRIMARY KEY (source, name))''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def high_water_mark(self, source, level):
+        '''
+        Latest mtime of the files processed for the source and level, or the
+        mtime of the oldest pending file (see set_pending()) if that is
+        older. Files older than this are all processed.
+
+        Returns
+        -------
+        float or None
+            Seconds since the epoch, None if no files have been processed.
+        '''
+        processed = self._db.execute(
+            'SELECT MAX(mtime) FROM files WHERE source = ? AND level = ?', (source, level)).fetchone()[0]
+        pending = self._db.execute(
+            'SELECT MIN(mtime) FROM pending WHERE source = ? AND level = ?', (source, level)).fetchone()[0]
+        if processed is None or pending is None:
+            return processed
+        return min(processed, pending)
+
+    def set_pending(self, source, level, files):
+        '''
+        Sets the files of the source and level that were listed but not
+        processed yet, replacing those of earlier runs (the listing goes back
+        to the oldest pending file, so it has all those still there).
+
+        Parameters
+        ----------
+        source : str
+        level : str
+        files : list
+            Of sensor.RemoteFile (or anything with path and mtime)
+        '''
+        with self._db:
+            self._db.execute('DELETE FROM pending WHERE source = ? AND level = ?', (source, level))
+            self._db.executemany(
+                'INSERT OR REPLACE INTO pending VALUES (?, ?, ?, ?)',
+                [(source, level, f.path, f.mtime) for f in files])
+
+    def processed(self, source, files):
+        '''
+        Parameters
+        ----------
+        source : str
+        files : list
+            Of sensor.RemoteFile (or anything with path, size and mtime)
+
+        Returns
+        -------
+        set
+            The paths of the files that have been processed, with the same
+            size and mtime.
+        '''
+        done = set()
+        for f in files:
+            row = self._db.execute(
+                'SELECT size, mtime FROM files WHERE source = ? AND path = ?', (source, f.path)).fetchone()
+            if row is not None and row[0] == f.size and row[1] == f.mtime:
+                done.add(f.path)
+        return done
+
+    def content_processed(self, source, sha256):
+        '''True if a file of the source with this content (sha256) has been processed.'''
+        row = self._db.execute(
+            'SELECT 1 FROM files WHERE source = ? AND sha256 = ? LIMIT 1', (source, sha256)).fetchone()
+        return row is not None
+
+    def record(self, source, level, remote_file, local_file=None, sha256=None):
+        '''
+        Records remote_file as processed, with the hash of local_file (its
+        local copy) if given, unless the hash (sha256) is given.
+        '''
+        if sha256 is None and local_file is not None and os.path.isfile(local_file):
+            sha256 = file_hash(local_file)
+        with self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (source, level, remote_file.path, remote_file.size, remote_file.mtime, sha256,
+                 datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')))
+            self._db.execute('DELETE FROM pending WHERE source = ? AND path = ?', (source, remote_file.path))
+        logger.debug(f"Recorded {source}/{remote_file.path} as processed.")
+
+    def last_time(self, source, name):
+        '''
+        Time of the last data ingested from the data file name.
+
+        Returns
+        -------
+        float or None
+            Seconds since the epoch, None if nothing has been ingested.
+        '''
+        row = self._db.execute(
+            'SELECT last_time FROM data_times WHERE source = ? AND name = ?', (source, name)).fetchone()
+        return None if row is None else row[0]
+
+    def record_last_time(self, source, name, last_time):
+        '''Records the time (seconds since the epoch) of the last data ingested from the data file name.'''
+        previous = self.last_time(source, name)
+        if previous is not None and previous >= last_time:
+            return
+        with self._db:
+            self._db.execute('INSERT OR REPLACE INTO data_times VALUES (?, ?, ?)', (source, name, last_time))